@@ -0,0 +1,49 @@
+from stand_in_server import build_pages
+from stream_decoder import decode_page
+import tracemalloc
+import json
+import copy
+import time
+import sys
+
+
+def river_page(unpriced=4, private=1):
+    # the archived items are all priced, the real river is mostly unpriced items and private stashes
+    stashes = []
+    for page in build_pages('data', stashes_per_page=1000).values():
+        for stash in page['stashes']:
+            stash = copy.deepcopy(stash)
+            for item in list(stash['items']):
+                for _ in range(unpriced):
+                    temp = dict(item)
+                    temp.pop('note', None)
+                    stash['items'].append(temp)
+            stashes.append(stash)
+            for _ in range(private):
+                temp = copy.deepcopy(stash)
+                temp['public'] = False
+                temp['id'] = temp['id'] + '-private'
+                stashes.append(temp)
+    return json.dumps({'next_change_id': '1', 'stashes': stashes})
+
+
+def measure(function, text, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function(text)
+    elapsed = (time.perf_counter() - start) / rounds
+    tracemalloc.start()
+    function(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    unpriced = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    text = river_page(unpriced)
+    print("page: %.1f MB, %i unpriced copies per priced item, one private copy per stash"
+          % (len(text) / 1e6, unpriced))
+    for name, function in [('json.loads', json.loads), ('decode_page', decode_page)]:
+        elapsed, peak = measure(function, text, 10)
+        print("%-12s %8.1f ms  peak %8.1f MB" % (name, elapsed * 1e3, peak / 1e6))
@@ -0,0 +1,49 @@
+from stand_in_server import load_items
+from mod_parser import parse_mods, normalize_mod, cache_stats
+import copy
+import time
+import glob
+import re
+import os
+
+
+def parse_mods_uncached(item):
+    # the old loop of get_api_response, kept here as the baseline
+    temp_mods = {"Original": []}
+    for key in ['implicitMods', 'craftedMods', 'explicitMods']:
+        if key in item:
+            for n in item[key]:
+                temp_number = re.findall(r"\d+\.*\d*", n)
+                temp_number = [float(n) for n in temp_number]
+                temp_string = re.sub(r"\d+\.*\d*", "X", n)
+                if len(temp_number) == 0:
+                    temp_mods[temp_string] = 1
+                else:
+                    temp_mods[temp_string] = sum(temp_number) / len(temp_number)
+                temp_mods["Original"].append(n)
+            item.pop(key, None)
+    return temp_mods
+
+
+def run(function, items, rounds):
+    copies = [copy.deepcopy(items) for _ in range(rounds)]
+    start = time.perf_counter()
+    for batch in copies:
+        for item in batch:
+            function(item)
+    return (time.perf_counter() - start) / (len(items) * rounds)
+
+
+if __name__ == "__main__":
+    items = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', '*.json'))):
+        items += load_items(path)
+    rounds = 200
+    normalize_mod.cache_clear()
+    old = run(parse_mods_uncached, items, rounds)
+    new = run(parse_mods, items, rounds)
+    print("items: %i, rounds: %i" % (len(items), rounds))
+    print("uncached: %8.2f us per item" % (old * 1e6))
+    print("cached:   %8.2f us per item" % (new * 1e6))
+    print("speed up: %8.2fx" % (old / new))
+    print(cache_stats())
@@ -0,0 +1,41 @@
+import datetime
+import json
+import os
+
+
+class checkpoint_store:
+    """
+    remember the next change id once the batch holding its page is written
+    with a collection the checkpoint lives in the same mongo database as the items,
+    otherwise in last_user.json, which is replaced in one step so a crash never corrupts it
+    """
+
+    def __init__(self, collection=None, path='last_user.json', name='crawler'):
+        self.collection = collection
+        self.path = path
+        self.name = name
+
+    def load(self):
+        if self.collection is not None:
+            doc = self.collection.find_one({'_id': self.name})
+            if doc is not None:
+                return str(doc['change_id'])
+        # first run against mongo, carry on from the old checkpoint file
+        if os.path.exists(self.path):
+            with open(self.path) as json_data:
+                data = json.load(json_data)
+            return str(data["last_user"])
+        return "0"
+
+    def save(self, change_id, items=0):
+        if self.collection is not None:
+            self.collection.update_one({'_id': self.name},
+                                       {'$set': {'change_id': change_id, 'time': datetime.datetime.utcnow()},
+                                        '$inc': {'items': items, 'batches': 1}},
+                                       upsert=True)
+            return
+        with open(self.path + '.tmp', 'w') as outfile:
+            json.dump({"last_user": change_id}, outfile)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,69 @@
+import requests
+from requests.adapters import HTTPAdapter
+import time
+
+
+class crawler_session:
+    """
+    one keep-alive session for the whole crawl
+    the connections are pooled and reused, and the stash pages are asked for gzip
+    """
+
+    def __init__(self, base_url="http://api.pathofexile.com/public-stash-tabs/?id=", connect_timeout=5,
+                 read_timeout=60, pool_size=4):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        # bytes_wire and the compression ratio only count the responses whose size on the wire is known
+        self.stats = {'requests': 0, 'seconds': 0.0, 'bytes_wire': 0, 'bytes_decoded': 0, 'bytes_decoded_known': 0,
+                      'unknown_wire': 0}
+        self.last = {}
+
+    def get(self, change_id):
+        start = time.time()
+        r = self.session.get(self.base_url + change_id, timeout=self.timeout)
+        # touching content finishes the download, so the timing covers the whole body
+        decoded = len(r.content)
+        elapsed = time.time() - start
+        encoding = r.headers.get('Content-Encoding', 'identity')
+        wire = self.wire_size(r, decoded, encoding)
+        self.last = {'change_id': change_id, 'status': r.status_code, 'seconds': elapsed,
+                     'bytes_wire': wire, 'bytes_decoded': decoded, 'encoding': encoding}
+        self.stats['requests'] += 1
+        self.stats['seconds'] += elapsed
+        self.stats['bytes_decoded'] += decoded
+        if wire is None:
+            self.stats['unknown_wire'] += 1
+        else:
+            self.stats['bytes_wire'] += wire
+            self.stats['bytes_decoded_known'] += decoded
+        return r
+
+    @staticmethod
+    def wire_size(r, decoded, encoding):
+        """
+        :return: the bytes of the body on the wire, None when they are not known
+        a chunked gzip answer has no Content-Length and urllib3 does not count the chunks it reads in tell()
+        """
+        if 'Content-Length' in r.headers:
+            return int(r.headers['Content-Length'])
+        if encoding == 'identity':
+            return decoded
+        read = r.raw.tell()
+        return read if read > 0 else None
+
+    def summary(self):
+        n = max(self.stats['requests'], 1)
+        return {'requests': self.stats['requests'],
+                'avg_seconds': self.stats['seconds'] / n,
+                'bytes_wire': self.stats['bytes_wire'],
+                'bytes_decoded': self.stats['bytes_decoded'],
+                'unknown_wire': self.stats['unknown_wire'],
+                'compression_ratio': self.stats['bytes_decoded_known'] / max(self.stats['bytes_wire'], 1)}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,106 @@
+from mod_parser import parse_mods
+from price_parser import parse_price, chaos_value
+from socket_parser import parse_sockets
+from item_stats import item_stats
+from taxonomy import categorize
+from item_record import item_record, compress_original
+import re
+
+# the words of a name, apostrophes stay inside them: "kaom's", "two-stone" is "two" and "stone"
+NAME_WORD = re.compile(r"[\w']+", re.UNICODE)
+
+
+def normalize_item(item, owner, stash_id, change_id, registry=None, keep_original=False):
+    """
+    turn one raw item from the api into the record we store
+    :param item: the item dict from the api, left as it is
+    :param owner: the account name of the stash
+    :param stash_id: the id of the stash
+    :param change_id: the change id of the page, stored as idx
+    :param registry: a mod_registry to also store the mods as [id, value] pairs
+    :param keep_original: also keep the whole api item, compressed, the search page rebuilds the mod lines without it
+    :return: an item_record, or None if it has no price we understand
+    """
+    # Parse currency, the price is also stored in chaos orbs so every currency can be sorted together
+    price = parse_price(item['note'])
+    if price is None:
+        return None
+    kind, amount, currency = price
+    record = item_record(id=item.get('id'), icon=item.get('icon'), league=item.get('league'),
+                         frameType=item.get('frameType'), ilvl=item.get('ilvl'), identified=item.get('identified'),
+                         corrupted=item.get('corrupted'), verified=item.get('verified'), owner=owner,
+                         stash_id=stash_id, idx=change_id,
+                         Price={'Currency': currency, 'Number': amount, 'Kind': kind},
+                         chaos_value=chaos_value(amount, currency))
+
+    # set the value into int
+    if 'requirements' in item:
+        temp_req = {}
+        for req in item['requirements']:
+            temp_req[req['name']] = int(req['values'][0][0])
+        record.requirements = temp_req
+
+    # set the value into float
+    if 'properties' in item:
+        temp_prop = {}
+        for prop in item['properties']:
+            if len(prop['values']) >= 1:
+                value = prop['values'][0][0]
+                if "%" in value:
+                    temp_prop[prop['name']] = float(value[:-1])
+                elif "-" in value:
+                    atk = [float(n) for n in value.split('-')]
+                    temp_prop[prop['name']] = sum(atk) / len(atk)
+                else:
+                    try:
+                        temp_prop[prop['name']] = float(value)
+                    except:
+                        temp_prop[prop['name']] = value
+        record.properties = temp_prop
+
+    # max link, colour pattern and linked groups, all indexed
+    if 'sockets' in item:
+        record.sockets = parse_sockets(item['sockets'])
+
+    # parsing the mods into [{k: template, v: value}] for the multikey mods.k, mods.v index,
+    # the lines themselves are only kept in the original
+    mods = parse_mods(item)
+    mods.pop("Original")
+    record.mods = [{'k': template, 'v': value} for template, value in mods.items()]
+
+    # dps and defences at 20% quality, they need the local mods
+    if 'properties' in item:
+        for name, value in item_stats(item['properties'], mods).items():
+            setattr(record, name, value)
+
+    if registry is not None:
+        compact_mods(record, registry)
+
+    # Parse name
+    name = item['name'].replace("<<set:MS>><<set:M>><<set:S>>", "").strip()
+    record.typeLine = item['typeLine'].replace("<<set:MS>><<set:M>><<set:S>>", "").strip()
+    record.name = (name + " " + record.typeLine).strip()
+    record.name_lower, record.name_tokens = name_keys(record.name)
+
+    # category and its ancestors from the icon path, "weapon.two.bow" in ["weapon", "weapon.two", ...]
+    record.category, record.categories = categorize(item)
+
+    if keep_original:
+        record.original = compress_original(item)
+    return record
+
+
+def name_keys(name):
+    """
+    :param name: the stored name, "Kaom's Heart Glorious Plate"
+    :return: ("kaom's heart glorious plate", ["glorious", "heart", "kaom's", "plate"])
+    the search matches the words of the query as prefixes of name_tokens, one multikey index lookup each
+    """
+    lower = name.lower()
+    return lower, sorted(set(NAME_WORD.findall(lower)))
+
+
+def compact_mods(record, registry):
+    # the template of every mod is replaced by its small id
+    record.mods = registry.compact(record.mods)
+    return record
@@ -0,0 +1,41 @@
+from bson.binary import Binary
+import json
+import zlib
+
+# the only fields we store, the rest of the api item (flavourText, x, y, w, h, inventoryId, the mod lines ...)
+# is dropped, or kept inside the compressed original when the crawler asks for it
+FIELDS = ('id', 'name', 'name_lower', 'name_tokens', 'typeLine', 'icon', 'category', 'categories', 'league',
+          'frameType', 'ilvl', 'identified', 'corrupted', 'verified', 'owner', 'stash_id', 'idx', 'requirements',
+          'properties', 'sockets', 'mods', 'Price', 'chaos_value', 'pdps', 'edps', 'dps', 'armour', 'evasion',
+          'energy_shield', 'original')
+
+
+class item_record:
+    """
+    the searchable part of one item, built by item_parser.normalize_item without touching the api dict
+    original is the optional api item as zlib compressed json
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, fields.get(name))
+
+    def to_bson(self):
+        # the document we write, the fields that are not set are left out
+        doc = {}
+        for name in FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                doc[name] = value
+        if self.original is not None:
+            doc['original'] = Binary(self.original)
+        return doc
+
+
+def compress_original(item, level=6):
+    return zlib.compress(json.dumps(item, separators=(',', ':')).encode('utf-8'), level)
+
+
+def inflate_original(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
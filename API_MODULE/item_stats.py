@@ -0,0 +1,84 @@
+# the quality every item is compared at, like the trade sites do
+QUALITY = 20.0
+
+# local "increased" mods that quality adds to, per stat
+INCREASED = {'Physical Damage': ['X% increased Physical Damage'],
+             'Armour': ['X% increased Armour', 'X% increased Armour and Evasion',
+                        'X% increased Armour and Energy Shield', 'X% increased Armour, Evasion and Energy Shield'],
+             'Evasion Rating': ['X% increased Evasion Rating', 'X% increased Armour and Evasion',
+                                'X% increased Evasion and Energy Shield',
+                                'X% increased Armour, Evasion and Energy Shield'],
+             'Energy Shield': ['X% increased Energy Shield', 'X% increased Armour and Energy Shield',
+                               'X% increased Evasion and Energy Shield',
+                               'X% increased Armour, Evasion and Energy Shield']}
+
+# the stored field of every defence
+DEFENCES = {'Armour': 'armour', 'Evasion Rating': 'evasion', 'Energy Shield': 'energy_shield'}
+
+# the properties given as damage ranges and the ones given as one number
+DAMAGES = ['Physical Damage', 'Elemental Damage', 'Chaos Damage']
+NUMBERS = ['Quality', 'Attacks per Second'] + list(DEFENCES)
+
+# the local mods that make the elemental damage of a weapon
+ELEMENTAL = ['Adds X to X Fire Damage', 'Adds X to X Cold Damage', 'Adds X to X Lightning Damage']
+
+
+def average_damage(values):
+    # [['14-31', 5], ['2-42', 6]] -> the sum of the averages of every damage type
+    total = 0.0
+    for text, _ in values:
+        low, high = text.split('-')
+        total += (float(low) + float(high)) / 2
+    return total
+
+
+def property_number(values):
+    # [['+20%', 1]] -> 20.0, [['1.20', 0]] -> 1.2
+    return float(values[0][0].rstrip('%').lstrip('+'))
+
+
+def at_quality(value, stat, quality, mods):
+    # take the current quality out and put QUALITY in, both add to the local increased mods
+    if quality >= QUALITY:
+        return value
+    increased = sum(mods.get(n, 0) for n in INCREASED[stat])
+    return value * (100 + increased + QUALITY) / (100 + increased + quality)
+
+
+def item_stats(properties, mods):
+    """
+    :param properties: the properties list of the api item
+    :param mods: {template: value} from mod_parser.parse_mods
+    :return: {'pdps', 'edps', 'dps'} for weapons, {'armour', 'evasion', 'energy_shield'} for armours,
+             all at QUALITY quality, only the ones the item has
+    """
+    numbers = {}
+    for prop in properties:
+        if len(prop['values']) == 0:
+            continue
+        if prop['name'] in DAMAGES:
+            numbers[prop['name']] = average_damage(prop['values'])
+        elif prop['name'] in NUMBERS:
+            numbers[prop['name']] = property_number(prop['values'])
+    return stats(numbers, mods)
+
+
+def stats(numbers, mods):
+    """
+    :param numbers: {property name: number}, the damages as the sum of the averages of their ranges
+    :param mods: {template: value}
+    :return: the dps and defences like item_stats
+    """
+    quality = numbers.get('Quality', 0.0)
+    temp = {}
+    if 'Attacks per Second' in numbers:
+        aps = numbers['Attacks per Second']
+        physical = numbers.get('Physical Damage', 0.0)
+        temp['pdps'] = round(at_quality(physical, 'Physical Damage', quality, mods) * aps, 1)
+        temp['edps'] = round(numbers.get('Elemental Damage', 0.0) * aps, 1)
+        chaos = numbers.get('Chaos Damage', 0.0) * aps
+        temp['dps'] = round(temp['pdps'] + temp['edps'] + chaos, 1)
+    for stat, field in DEFENCES.items():
+        if stat in numbers:
+            temp[field] = round(at_quality(numbers[stat], stat, quality, mods))
+    return temp
@@ -0,0 +1,186 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from contextlib import contextmanager
+from collections import deque
+import requests
+import threading
+import json
+import time
+import os
+
+COUNTERS = ['pages', 'items_seen', 'items_kept', 'items_inserted', 'bytes_downloaded']
+STAGES = ['fetch', 'decode', 'normalize', 'write']
+
+# poe.ninja follows the river and publishes the newest change id as next_change_id
+NINJA_STATS_URL = 'http://poe.ninja/api/Data/GetStats'
+
+
+def change_id_lag(current, head):
+    # a change id is one counter per shard, "2300-4355-3306-4374-1278", the lag is how far behind all of them are
+    try:
+        return sum(max(int(h) - int(c), 0) for c, h in zip(current.split('-'), head.split('-')))
+    except ValueError:
+        return None
+
+
+def head_from_url(url=NINJA_STATS_URL, timeout=10):
+    """
+    :param url: a json document with the newest change id as next_change_id, poe.ninja or the stand-in /stats
+    :return: a function for follow_head
+    """
+    def head():
+        r = requests.get(url, timeout=timeout)
+        r.raise_for_status()
+        return r.json()['next_change_id']
+    return head
+
+
+class crawler_metrics:
+    """
+    counters, time per stage, gauges and rates over the last window seconds
+    served in the prometheus text format by serve(port) and written to a stats file by write_every(path)
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_count = dict.fromkeys(STAGES, 0)
+        # name -> function giving the current value, for example the length of a queue
+        self.gauges = {}
+        self.current_id = None
+        self.head_id = None
+        self.history = deque()
+        self.start = time.time()
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_count[stage] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.time() - start)
+
+    def gauge(self, name, function):
+        self.gauges[name] = function
+
+    def set_change_id(self, current=None, head=None):
+        if current is not None:
+            self.current_id = current
+        if head is not None:
+            self.head_id = head
+
+    def rates(self):
+        # per second over the last window seconds
+        now = time.time()
+        with self.lock:
+            snapshot = dict(self.counters)
+            self.history.append((now, snapshot))
+            while len(self.history) > 1 and now - self.history[0][0] > self.window:
+                self.history.popleft()
+            then, old = self.history[0]
+        elapsed = now - then
+        if elapsed <= 0:
+            return dict.fromkeys(COUNTERS, 0.0)
+        return {name: (snapshot[name] - old[name]) / elapsed for name in COUNTERS}
+
+    def snapshot(self):
+        rates = self.rates()
+        with self.lock:
+            temp = {'uptime_seconds': time.time() - self.start,
+                    'counters': dict(self.counters),
+                    'rates_per_second': rates,
+                    'pages_per_minute': rates['pages'] * 60,
+                    'stage_seconds': dict(self.stage_seconds),
+                    'stage_count': dict(self.stage_count),
+                    'current_change_id': self.current_id,
+                    'head_change_id': self.head_id}
+        temp['gauges'] = {name: function() for name, function in self.gauges.items()}
+        if self.current_id is not None and self.head_id is not None:
+            temp['lag'] = change_id_lag(self.current_id, self.head_id)
+        return temp
+
+    def prometheus(self):
+        stats = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# HELP poe_crawler_%s %s' % (name, help_text))
+            lines.append('# TYPE poe_crawler_%s %s' % (name, kind))
+            for labels, value in samples:
+                lines.append('poe_crawler_%s%s %s' % (name, labels, float(value)))
+
+        for name in COUNTERS:
+            metric(name + '_total', 'counter', name.replace('_', ' '), [('', stats['counters'][name])])
+            metric(name + '_per_second', 'gauge', name.replace('_', ' ') + ' per second over the window',
+                   [('', stats['rates_per_second'][name])])
+        metric('pages_per_minute', 'gauge', 'pages per minute over the window', [('', stats['pages_per_minute'])])
+        metric('stage_seconds_total', 'counter', 'time spent per stage',
+               [('{stage="%s"}' % n, stats['stage_seconds'][n]) for n in STAGES])
+        metric('stage_calls_total', 'counter', 'calls per stage',
+               [('{stage="%s"}' % n, stats['stage_count'][n]) for n in STAGES])
+        for name, value in sorted(stats['gauges'].items()):
+            metric(name, 'gauge', name.replace('_', ' '), [('', value)])
+        if stats.get('lag') is not None:
+            metric('change_id_lag', 'gauge', 'sum over the shards of how far the crawler is behind the head',
+                   [('', stats['lag'])])
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        # GET /metrics in the prometheus text format, in a background thread
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def write_every(self, path='crawler_stats.json', interval=10):
+        # rewrite the stats file every interval seconds, in a background thread
+        def loop():
+            while True:
+                time.sleep(interval)
+                with open(path + '.tmp', 'w') as outfile:
+                    json.dump(self.snapshot(), outfile, indent=2)
+                os.replace(path + '.tmp', path)
+
+        t = threading.Thread(target=loop, daemon=True)
+        t.start()
+        return t
+
+    def follow_head(self, function, interval=60):
+        # function() returns the newest change id, for example from poe.ninja, polled in a background thread
+        def loop():
+            while True:
+                try:
+                    self.set_change_id(head=function())
+                except Exception as e:
+                    print("Could not get the head change id: %s" % e)
+                time.sleep(interval)
+
+        t = threading.Thread(target=loop, daemon=True)
+        t.start()
+        return t
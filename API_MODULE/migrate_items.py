@@ -0,0 +1,195 @@
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from price_parser import ALIASES, RATES, chaos_value, load_rates
+from socket_parser import canonical_group, ORDER
+from taxonomy import categorize
+from item_parser import name_keys
+from item_stats import stats, DEFENCES, ELEMENTAL
+import argparse
+import time
+
+
+def mods_array(doc):
+    """
+    :param doc: a stored item with the old mod fields
+    :return: [{'k': template or id, 'v': value}, ...]
+    """
+    if 'ModIds' in doc:
+        return [{'k': mod_id, 'v': value} for mod_id, value in doc['ModIds']]
+    return [{'k': template, 'v': value} for template, value in doc.get('Mods', {}).items() if template != 'Original']
+
+
+def mods_update(doc, templates):
+    """
+    move Mods.<template> and ModIds into mods: [{k, v}]
+    Mods.Original stays for the documents that have no compressed original to show their mod lines from
+    """
+    update = {'$set': {'mods': mods_array(doc)}, '$unset': {'ModIds': ''}}
+    if 'original' in doc or 'Original' not in doc.get('Mods', {}):
+        update['$unset']['Mods'] = ''
+    else:
+        update['$set']['Mods'] = {'Original': doc['Mods']['Original']}
+    return update
+
+
+def price_update(doc, templates):
+    # the currency as the crawler names it now and the price in chaos orbs
+    price = doc.get('Price') or {}
+    currency = ALIASES.get(str(price.get('Currency', '')).lower())
+    try:
+        amount = float(price['Number'])
+    except (KeyError, TypeError, ValueError):
+        amount = None
+    if currency is None or amount is None:
+        # a price the crawler does not store any more, hidden from the search like a sold item
+        return {'$set': {'chaos_value': None, 'active': False}}
+    return {'$set': {'Price.Currency': currency, 'chaos_value': chaos_value(amount, currency)}}
+
+
+def socket_update(doc, templates):
+    """
+    the old sockets only kept the size of every linked group and the count of every colour,
+    the colours of the groups are only known when there is one group or one colour
+    """
+    sockets = doc['sockets']
+    link = sockets.get('link') or []
+    count = {'R': sockets.get('S', 0), 'G': sockets.get('D', 0), 'B': sockets.get('I', 0)}
+    # the old crawler always stored Other as 0
+    count['W'] = sockets.get('socket_number', sum(link)) - sum(count.values())
+    update = {'sockets.max_link': max(link) if link else 0, 'sockets.Other': count['W']}
+    colours = [c for c in ORDER if count.get(c, 0) > 0]
+    groups = None
+    if len(link) == 1:
+        groups = [canonical_group(''.join(c * count[c] for c in colours))]
+    elif len(colours) == 1:
+        groups = [colours[0] * n for n in sorted(link, reverse=True)]
+    if groups is not None:
+        update['sockets.groups'] = groups
+        update['sockets.pattern'] = '-'.join(groups)
+    return {'$set': update}
+
+
+def category_update(doc, templates):
+    # the old documents kept the whole api item, its icon, typeLine and frameType give the category
+    category, categories = categorize(doc) if 'icon' in doc else (None, [])
+    update = {'$set': {'categories': categories}, '$unset': {'type': ''}}
+    if category is not None:
+        update['$set']['category'] = category
+    return update
+
+
+def stats_update(doc, templates):
+    """
+    the dps and defences from the stored properties, already averaged numbers, and the local mods like item_stats
+    the stored Elemental Damage is its first damage type only, the sum of the local elemental mods is all of them
+    """
+    numbers = {name: value for name, value in doc['properties'].items() if isinstance(value, (int, float))}
+    mods = doc['mods'] if 'mods' in doc else mods_array(doc)
+    mods = {templates.get(n['k'], n['k']): n['v'] for n in mods}
+    if any(template in mods for template in ELEMENTAL):
+        numbers['Elemental Damage'] = sum(mods.get(template, 0) for template in ELEMENTAL)
+    return {'$set': stats(numbers, mods)}
+
+
+def names_update(doc, templates):
+    # the lower case name and its words for the name search
+    name_lower, name_tokens = name_keys(doc['name'])
+    return {'$set': {'name_lower': name_lower, 'name_tokens': name_tokens}}
+
+
+# the stats step matches the items with a weapon or defence property and not its field
+STATS = [{'properties.Attacks per Second': {'$exists': True}, 'pdps': {'$exists': False}}] + \
+        [{'properties.' + stat: {'$exists': True}, field: {'$exists': False}} for stat, field in DEFENCES.items()]
+
+# name -> (the documents written before the field, the fields the update reads,
+#          (doc, {mod id: template}) -> its update)
+# every update sets the field of the query, so a document is never updated twice
+STEPS = [('mods', {'mods': {'$exists': False}, '$or': [{'Mods': {'$exists': True}}, {'ModIds': {'$exists': True}}]},
+          {'Mods': 1, 'ModIds': 1, 'original': 1}, mods_update),
+         ('prices', {'chaos_value': {'$exists': False}}, {'Price': 1}, price_update),
+         ('sockets', {'sockets': {'$exists': True}, 'sockets.max_link': {'$exists': False}}, {'sockets': 1},
+          socket_update),
+         ('categories', {'categories': {'$exists': False}}, {'icon': 1, 'typeLine': 1, 'frameType': 1},
+          category_update),
+         ('stats', {'$or': STATS}, {'properties': 1, 'mods': 1, 'Mods': 1, 'ModIds': 1}, stats_update),
+         ('names', {'name_tokens': {'$exists': False}, 'name': {'$type': 'string'}}, {'name': 1}, names_update)]
+
+
+def migrate_step(posts, query, fields, update, batch_size=1000, templates=None):
+    # one pass of a cursor over the matching documents, updated in unordered bulk batches
+    done = 0
+    start = time.time()
+    cursor = posts.find(query, fields, no_cursor_timeout=True).batch_size(batch_size)
+    try:
+        operations = []
+        for doc in cursor:
+            operations.append(UpdateOne({'_id': doc['_id']}, update(doc, templates or {})))
+            if len(operations) == batch_size:
+                done += write(posts, operations)
+                operations = []
+                print("%8i documents done, %.0f per second" % (done, done / max(time.time() - start, 1e-6)))
+        if len(operations) != 0:
+            done += write(posts, operations)
+    finally:
+        cursor.close()
+    return done
+
+
+def write(posts, operations):
+    try:
+        return posts.bulk_write(operations, ordered=False).modified_count
+    except BulkWriteError as e:
+        print("%i write errors in the batch" % len(e.details['writeErrors']))
+        return e.details['nModified']
+
+
+def migrate(uri='mongodb://localhost:27017/', db_name='project_542', steps=None, batch_size=1000):
+    """
+    bring the documents stored by older crawlers up to the fields the search uses now
+    :param steps: the names of the STEPS to run, all of them by default
+    :return: {step name: documents updated}
+    """
+    client = MongoClient(uri)
+    posts = client[db_name].posts
+    # the mod ids of a mod_registry, the stats step looks up the templates of the local mods
+    templates = {doc['_id']: doc['template'] for doc in client[db_name].mod_templates.find()}
+    temp = {}
+    for name, query, fields, update in STEPS:
+        if steps is None or name in steps:
+            print("Migrating %s" % name)
+            temp[name] = migrate_step(posts, query, fields, update, batch_size, templates)
+    client.close()
+    return temp
+
+
+def reprice(uri='mongodb://localhost:27017/', db_name='project_542', batch_size=1000):
+    """
+    compute chaos_value again with the current RATES, after currency_rates.json changed
+    one pass per currency over the Price.Currency, Price.Number index
+    :return: {currency: documents updated}
+    """
+    client = MongoClient(uri)
+    posts = client[db_name].posts
+    temp = {}
+    for currency in sorted(RATES):
+        print("Repricing %s at %g chaos" % (currency, RATES[currency]))
+        temp[currency] = migrate_step(posts, {'Price.Currency': currency}, {'Price': 1}, price_update, batch_size)
+    client.close()
+    return temp
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the stored items up to the fields of the crawler")
+    parser.add_argument('uri', nargs='?', default='mongodb://localhost:27017/')
+    parser.add_argument('database', nargs='?', default='project_542')
+    parser.add_argument('steps', nargs='*', help='the steps to run, all of them by default: %s'
+                                                 % ', '.join(n[0] for n in STEPS))
+    parser.add_argument('--rates', nargs='?', const='', default=None, metavar='FILE',
+                        help='only compute chaos_value again, with currency_rates.json or the rates of FILE')
+    args = parser.parse_args()
+    if args.rates is not None:
+        if args.rates:
+            load_rates(args.rates)
+        reprice(args.uri, args.database)
+    else:
+        migrate(args.uri, args.database, steps=args.steps or None)
@@ -0,0 +1,42 @@
+from functools import lru_cache
+import re
+
+NUMBER = re.compile(r"\d+\.*\d*")
+
+# the same few thousand mod lines come back over and over again
+CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_mod(text):
+    """
+    :param text: the mod line from the api, for example "5% increased Attack Speed"
+    :return: the template "X% increased Attack Speed" and the numbers in it (5.0,)
+    """
+    return NUMBER.sub("X", text), tuple(float(n) for n in NUMBER.findall(text))
+
+
+def mod_value(values):
+    # mods without a number are stored as 1, ranges as their average
+    if len(values) == 0:
+        return 1
+    return sum(values) / len(values)
+
+
+def parse_mods(item):
+    # merge the implicit, crafted and explicit mods into one dict, the item is not changed
+    temp_mods = {"Original": []}
+    for key in ['implicitMods', 'craftedMods', 'explicitMods']:
+        if key in item:
+            for n in item[key]:
+                template, values = normalize_mod(n)
+                temp_mods[template] = mod_value(values)
+                temp_mods["Original"].append(n)
+    return temp_mods
+
+
+def cache_stats():
+    info = normalize_mod.cache_info()
+    total = info.hits + info.misses
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize,
+            'hit_ratio': info.hits / total if total else 0.0}
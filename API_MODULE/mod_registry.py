@@ -0,0 +1,69 @@
+import json
+import os
+
+
+class mod_registry:
+    """
+    give every mod template a small integer id that never changes
+    the mapping is kept in the mongo collection mod_templates ({_id: id, template: text}) so the
+    search server can read it, or in a local json file when no collection is given
+    """
+
+    def __init__(self, collection=None, path='mod_templates.json'):
+        self.collection = collection
+        self.path = path
+        self.ids = {}
+        self.templates = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if self.collection is not None:
+            self.collection.create_index('template', unique=True)
+            for doc in self.collection.find():
+                self.add(doc['template'], doc['_id'])
+        elif os.path.exists(self.path):
+            with open(self.path) as json_data:
+                for template, mod_id in json.load(json_data).items():
+                    self.add(template, mod_id)
+
+    def add(self, template, mod_id):
+        self.ids[template] = mod_id
+        self.templates[mod_id] = template
+
+    def get_id(self, template):
+        if template in self.ids:
+            return self.ids[template]
+        mod_id = len(self.ids)
+        if self.collection is not None:
+            # another crawler may have taken the template or the id first, reload and try again
+            from pymongo.errors import DuplicateKeyError
+            while True:
+                try:
+                    self.collection.insert_one({'_id': mod_id, 'template': template})
+                    break
+                except DuplicateKeyError:
+                    self.load()
+                    if template in self.ids:
+                        return self.ids[template]
+                    mod_id = max(self.templates) + 1
+        else:
+            self.dirty = True
+        self.add(template, mod_id)
+        return mod_id
+
+    def compact(self, mods):
+        """
+        :param mods: [{'k': template, 'v': value}, ...] as stored by item_parser.normalize_item
+        :return: [{'k': id, 'v': value}, ...]
+        """
+        return [{'k': self.get_id(n['k']), 'v': n['v']} for n in mods]
+
+    def save(self):
+        # the file is replaced in one step so a crash never leaves half a mapping behind
+        if self.collection is not None or not self.dirty:
+            return
+        with open(self.path + '.tmp', 'w') as outfile:
+            json.dump(dict(self.ids), outfile)
+        os.replace(self.path + '.tmp', self.path)
+        self.dirty = False
@@ -0,0 +1,182 @@
+from pymongo import MongoClient, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+from itertools import islice
+import hashlib
+import json
+import time
+
+
+class bulk_writer:
+    """
+    keep one MongoClient for the whole crawl and write the parsed items in unordered bulk batches
+    a batch is flushed when it reaches batch_size items or when it is older than max_wait seconds
+    checkpoint(change_id, written) is called after every flush with the last change id the flush covers,
+    the items that still fail once retried are kept in the failed_items collection so the checkpoint moves on
+
+    mode 'insert' appends every listing, mode 'upsert' keeps one document per item id and skips
+    the items that did not change since we last wrote them
+    """
+
+    def __init__(self, uri='mongodb://localhost:27017/', db_name='project_542', batch_size=1000, max_wait=5.0,
+                 client=None, checkpoint=None, mode='insert', max_seen=500000, tracker=None):
+        self.client = client if client is not None else MongoClient(uri)
+        self.db = self.client[db_name]
+        self.posts = self.db.posts
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.checkpoint = checkpoint
+        # a crawler_metrics, set by get_data_api
+        self.metrics = None
+        self.mode = mode
+        # hash of the item id -> 8 bytes of the digest of what we last wrote, as ints (about 125 bytes an entry),
+        # the least recently seen tenth is dropped when it grows past max_seen
+        self.seen = {}
+        self.max_seen = max_seen
+        self.unchanged = 0
+        # only the indexes our own writes need, the search indexes are defined in
+        # Flask_Server/api_server/mongo_indexes.py and built with python manage.py indexes
+        if mode == 'upsert':
+            self.posts.create_index('id', unique=True)
+        # with a stash_tracker the items that vanished from their stash are removed after every batch
+        self.tracker = tracker
+        if tracker is not None:
+            self.posts.create_index([('stash_id', 1), ('id', 1)])
+        self.buffer = []
+        self.change_id = None
+        self.first_added = None
+        # a count without a filter reads the collection metadata, no scan, and is 0 before the collection exists
+        self.count = self.posts.count()
+        self.inserted = 0
+        self.updated = 0
+        # items already written before a restart, skipped by their _id
+        self.replayed = 0
+        # items that failed twice with an error other than a duplicate, kept in failed_items
+        self.write_errors = 0
+
+    def documents(self, items):
+        if self.mode == 'upsert':
+            # an item moved between two pages of the same batch is written once, with its latest version
+            latest = {}
+            for item in items:
+                latest[item['id']] = item
+            return list(latest.values())
+        # the _id comes from the page and the item id, so writing a page again after a crash is a no-op
+        for item in items:
+            if 'idx' in item and 'id' in item:
+                item['_id'] = item['idx'] + ':' + item['id']
+        return items
+
+    def operation(self, item):
+        if self.mode == 'upsert':
+            return ReplaceOne({'id': item['id']}, item, upsert=True)
+        return InsertOne(item)
+
+    def changed(self, items):
+        # the stash is sent again whenever anything in it changes, most of its items are the same as before
+        temp = []
+        for item in items:
+            digest = hashlib.md5(json.dumps({k: v for k, v in item.items() if k not in ['idx', '_id', 'original']},
+                                            sort_keys=True, default=str).encode('utf-8')).digest()
+            digest = int.from_bytes(digest[:8], 'big')
+            key = hash(item['id'])
+            # popped and put back, so the dict stays in the order the items were last seen
+            if self.seen.pop(key, None) == digest:
+                self.unchanged += 1
+            else:
+                temp.append(item)
+            self.seen[key] = digest
+        if len(self.seen) > self.max_seen:
+            for key in list(islice(self.seen, len(self.seen) - self.max_seen + self.max_seen // 10)):
+                del self.seen[key]
+        return temp
+
+    def add(self, items, change_id, snapshot=None):
+        # items are item_records, turned into their documents here
+        items = [item.to_bson() for item in items]
+        if self.first_added is None:
+            self.first_added = time.time()
+        if self.tracker is not None and snapshot is not None:
+            self.tracker.update(snapshot)
+        if self.mode == 'upsert':
+            items = self.changed(items)
+        self.buffer += items
+        self.change_id = change_id
+        if len(self.buffer) >= self.batch_size or time.time() - self.first_added >= self.max_wait:
+            self.flush()
+
+    def flush(self):
+        if self.metrics is None:
+            self.write()
+        else:
+            with self.metrics.timer('write'):
+                written = self.write()
+            self.metrics.inc('items_inserted', written)
+
+    def bulk(self, items):
+        """
+        :return: the number of items written, [(item, write error)] for the errors other than duplicates
+        """
+        try:
+            result = self.posts.bulk_write([self.operation(item) for item in items], ordered=False)
+            self.updated += result.modified_count
+            return result.inserted_count + result.upserted_count, []
+        except BulkWriteError as e:
+            # unordered, so everything else in the batch is still written
+            self.updated += e.details['nModified']
+            errors = [n for n in e.details['writeErrors'] if n['code'] != 11000]
+            self.replayed += len(e.details['writeErrors']) - len(errors)
+            return e.details['nInserted'] + e.details['nUpserted'], [(items[n['index']], n) for n in errors]
+
+    def dead_letter(self, failed):
+        # the items are kept with their error for a look later on, if even that fails the crawler stops here
+        # with the checkpoint before the batch
+        self.db.failed_items.insert_many([{'item': item, 'change_id': self.change_id, 'code': error['code'],
+                                           'error': error['errmsg'], 'time': time.time()} for item, error in failed],
+                                         ordered=False)
+        self.write_errors += len(failed)
+        print("%i items failed twice, kept in failed_items" % len(failed))
+
+    def write(self):
+        written = 0
+        if len(self.buffer) != 0:
+            written, failed = self.bulk(self.documents(self.buffer))
+            if len(failed) != 0:
+                # a timeout or a failover is over by the second try, what still fails would fail forever
+                retried, failed = self.bulk([item for item, _ in failed])
+                written += retried
+            if len(failed) != 0:
+                self.dead_letter(failed)
+            self.inserted += written
+            self.count += written
+        if self.tracker is not None:
+            self.remove_vanished()
+        if len(self.buffer) != 0:
+            print('Now MongoDB has about %8i documents' % self.count)
+            print("==================")
+        if self.checkpoint is not None and self.change_id is not None:
+            self.checkpoint(self.change_id, written)
+        self.buffer = []
+        self.first_added = None
+        return written
+
+    def remove_vanished(self):
+        # an item that comes back unchanged (a stash made private then public again) must be written again
+        for item_id in self.tracker.vanished:
+            self.seen.pop(hash(item_id), None)
+        self.tracker.vanished = set()
+        operations = self.tracker.operations()
+        if len(operations) == 0:
+            return
+        try:
+            result = self.posts.bulk_write(operations, ordered=False)
+            removed = result.deleted_count + result.modified_count
+        except BulkWriteError as e:
+            removed = e.details['nRemoved'] + e.details['nModified']
+            print("%i write errors while removing sold items" % len(e.details['writeErrors']))
+        self.tracker.removed += removed
+        if self.tracker.remove == 'delete':
+            self.count -= removed
+
+    def close(self):
+        self.flush()
+        self.client.close()
@@ -0,0 +1,51 @@
+from concurrent.futures import ProcessPoolExecutor
+from item_parser import normalize_item, compact_mods
+from prefilter import item_prefilter
+
+
+def normalize_chunk(chunk, change_id, keep_original=False):
+    # runs in a worker process
+    return [normalize_item(item, owner, stash_id, change_id, keep_original=keep_original)
+            for item, owner, stash_id in chunk]
+
+
+class parallel_parser:
+    """
+    normalize the items of a page on a pool of worker processes
+    the page is cut into chunks of chunk_size items and the results come back in the page order
+    the mod ids are given out in this process, so the registry stays in one place
+    """
+
+    def __init__(self, workers=None, chunk_size=250):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.chunk_size = chunk_size
+
+    def parse_page(self, data, change_id, registry=None, prefilter=None, keep_original=False):
+        if prefilter is None:
+            prefilter = item_prefilter()
+        entries = []
+        for account in data['stashes']:
+            # player with public stashes and has items
+            if account['public'] != False and len(account['items']) != 0:
+                for item in account['items']:
+                    # the filter runs here, the dropped items are never sent to the pool
+                    if prefilter.accept(item):
+                        entries.append((item, account['accountName'], account['id']))
+        if len(entries) <= self.chunk_size:
+            # not worth sending to the pool
+            results = [normalize_chunk(entries, change_id, keep_original)]
+        else:
+            chunks = [entries[n:n + self.chunk_size] for n in range(0, len(entries), self.chunk_size)]
+            results = self.pool.map(normalize_chunk, chunks, [change_id] * len(chunks),
+                                    [keep_original] * len(chunks))
+        temp = []
+        for chunk in results:
+            for item in chunk:
+                if item is not None:
+                    if registry is not None:
+                        compact_mods(item, registry)
+                    temp.append(item)
+        return temp
+
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,119 @@
+from poe_api import get_data_api, argument_parser, start_metrics, crawler_from_args, close_crawler
+import threading
+import queue
+
+
+class pipeline_crawler:
+    """
+    run the fetch / parse / insert steps of get_data_api in their own threads
+    the fetcher asks for the next change id as soon as it has one, and the
+    bounded queues keep it from running too far ahead of the parser and the writer
+    """
+
+    def __init__(self, crawler=None, queue_size=4, grace=30.0):
+        self.crawler = crawler if crawler is not None else get_data_api()
+        self.page_queue = queue.Queue(maxsize=queue_size)
+        self.item_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        # (stage name, exception) of the stages that failed, the first one is raised by run()
+        self.errors = []
+        # seconds run() waits for the other stages after a failure
+        self.grace = grace
+        self.crawler.metrics.gauge('page_queue_depth', self.page_queue.qsize)
+        self.crawler.metrics.gauge('item_queue_depth', self.item_queue.qsize)
+
+    def put(self, q, value):
+        # after a failure the next stage may be gone, so a full queue is given up on instead of blocking forever
+        while True:
+            try:
+                q.put(value, timeout=0.5)
+                return True
+            except queue.Full:
+                if self.errors:
+                    return False
+
+    def stage(self, target, out_queue):
+        # every stage sends the None sentinel on, also when it fails, so the next stage never waits forever
+        try:
+            target()
+        except BaseException as e:
+            self.errors.append((target.__name__, e))
+            self.stop_event.set()
+            print("The %s stage failed: %r" % (target.__name__, e))
+        finally:
+            if out_queue is not None:
+                self.put(out_queue, None)
+
+    def fetcher(self):
+        change_id = self.crawler.user_id
+        while not self.stop_event.is_set():
+            data = self.crawler.fetch_page(change_id, self.stop_event)
+            if data is None:
+                break
+            next_id = data['next_change_id']
+            print("Current id: ", change_id + " next id: ", next_id)
+            if not self.put(self.page_queue, (change_id, next_id, data)):
+                break
+            change_id = next_id
+
+    def parser(self):
+        while True:
+            page = self.page_queue.get()
+            if page is None:
+                break
+            change_id, next_id, data = page
+            temp = self.crawler.parse_page(data, change_id)
+            if not self.put(self.item_queue, (next_id, temp, self.crawler.stash_snapshot(data, temp))):
+                break
+
+    def writer(self):
+        while True:
+            batch = self.item_queue.get()
+            if batch is None:
+                break
+            next_id, temp, snapshot = batch
+            # the writer only moves the checkpoint once the page is in the database
+            self.crawler.insert_items(temp, next_id, snapshot)
+            self.crawler.user_id = next_id
+        self.crawler.writer.flush()
+
+    def start(self):
+        for target, out_queue in [(self.fetcher, self.page_queue), (self.parser, self.item_queue),
+                                  (self.writer, None)]:
+            t = threading.Thread(target=self.stage, args=(target, out_queue), name=target.__name__, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        # the fetcher finishes its current page, then every stage drains and exits
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        for t in self.threads:
+            t.join(timeout)
+
+    def run(self):
+        self.start()
+        try:
+            while any(t.is_alive() for t in self.threads) and not self.errors:
+                self.join(1.0)
+        except KeyboardInterrupt:
+            # the fetcher gives up between two retries, a request in flight still gets its read timeout
+            self.stop()
+            self.join(self.grace)
+        if self.errors:
+            # the other stages write what they already have, the fetcher may still be waiting on the api
+            self.join(self.grace)
+            raise self.errors[0][1]
+
+
+if __name__ == "__main__":
+    args = argument_parser("Crawl the public stash river into MongoDB, fetch / parse / insert in threads").parse_args()
+    print("Start the pipelined crawler")
+    crawler = crawler_from_args(args)
+    start_metrics(crawler.metrics, args)
+    try:
+        pipeline_crawler(crawler).run()
+    finally:
+        close_crawler(crawler)
@@ -1,13 +1,47 @@
-from pymongo import MongoClient
+from http_session import crawler_session
+from scheduler import rate_limit_scheduler
+from item_parser import normalize_item
+from prefilter import item_prefilter
+from mongo_writer import bulk_writer
+from checkpoint import checkpoint_store
+from stream_decoder import decode_page
+from stash_diff import stash_tracker
+from mod_registry import mod_registry
+from parallel_parser import parallel_parser
+from raw_archive import raw_archive
+from metrics import crawler_metrics, head_from_url, NINJA_STATS_URL
 import requests
-import json
+import argparse
 import os
-import time
-import re
 
 
 class get_data_api:
-    def __init__(self):
+    def __init__(self, session=None, scheduler=None, registry=None, writer=None, checkpoints=None, parser=None,
+                 streaming=False, archive=None, prefilter=None, metrics=None, keep_original=False):
+        # one keep-alive session for every page we ask for
+        self.session = session if session is not None else crawler_session()
+        # decides how long to wait between the requests
+        self.scheduler = scheduler if scheduler is not None else rate_limit_scheduler()
+        # with a mod_registry the mods are stored with the small id of their template instead of the text
+        self.registry = registry
+        # also store every api item as compressed json, bigger documents for the exact mod lines
+        self.keep_original = keep_original
+        # with a parallel_parser the items of a page are normalized on a process pool
+        self.parser = parser
+        # decode the pages stash by stash and keep only the priced items instead of r.json()
+        self.streaming = streaming
+        # with a raw_archive every raw page is kept, compressed and indexed by its change id
+        self.archive = archive
+        # drops the items we do not store before they are normalized
+        self.prefilter = prefilter if prefilter is not None else item_prefilter()
+        # counters and time per stage, see metrics.py for the http endpoint and the stats file
+        self.metrics = metrics if metrics is not None else crawler_metrics()
+        # one mongo client for the whole crawl, the checkpoint moves when a batch is written
+        self.writer = writer if writer is not None else bulk_writer()
+        self.writer.checkpoint = self.record_last_user_id
+        self.writer.metrics = self.metrics
+        # by default the checkpoint is kept next to the items
+        self.checkpoints = checkpoints if checkpoints is not None else checkpoint_store(self.writer.db.checkpoints)
         # get the user id from last api query
         self.user_id = self.get_last_user_id()
         # create the folder for storing the data
@@ -16,190 +50,167 @@ class get_data_api:
 
     def get_last_user_id(self):
         # set the last user id
-        for file_name in os.listdir():
-            if file_name == 'last_user.json':
-                with open('last_user.json') as json_data:
-                    data = json.load(json_data)
-                return str(data["last_user"])
-        return "0"
-
-    def record_last_user_id(self, data):
+        return self.checkpoints.load()
+
+    def record_last_user_id(self, data, items=0):
         # record the user id
-        with open('last_user.json', 'w') as outfile:
-            json.dump({"last_user": data}, outfile)
+        self.checkpoints.save(data, items)
 
     def get_api_response(self):
         # we only store the items that have price note
-        api_url = "http://api.pathofexile.com/public-stash-tabs/?id="
-        r = requests.get(api_url + self.user_id)
-        data = r.json()
-        while 'next_change_id' not in data:
-            r = requests.get(api_url + self.user_id)
-            data = r.json()
-            print("==================")
-            print("Sleep for 1 minute")
-            print("==================")
-            time.sleep(60)
+        data = self.fetch_page(self.user_id)
         file_name = data['next_change_id']
         print("Current id: ", self.user_id + " next id: ", file_name)
+        temp = self.parse_page(data, self.user_id)
+        self.insert_items(temp, file_name, self.stash_snapshot(data, temp))
+        self.user_id = file_name
+
+    def fetch_page(self, change_id, stop_event=None):
+        # get one page of the river, the scheduler keeps us inside the api rate limits,
+        # None when stop_event is set before the page came
+        while stop_event is None or not stop_event.is_set():
+            self.scheduler.wait()
+            try:
+                with self.metrics.timer('fetch'):
+                    r = self.session.get(change_id)
+            except requests.RequestException:
+                self.scheduler.record_error()
+                print("Request failed, retry in %.1f seconds" % self.scheduler.delay)
+                continue
+            if self.session.last['bytes_wire'] is not None:
+                self.metrics.inc('bytes_downloaded', self.session.last['bytes_wire'])
+            try:
+                with self.metrics.timer('decode'):
+                    if self.streaming:
+                        data = decode_page(r.content.decode('utf-8'))
+                    else:
+                        data = r.json()
+            except ValueError:
+                # a 429 has an empty body, the scheduler still needs its status and Retry-After
+                data = None
+            if self.scheduler.record_response(r, data, change_id):
+                if self.archive is not None and data['next_change_id'] != change_id:
+                    self.archive.write(change_id, data['next_change_id'], r.content)
+                self.metrics.inc('pages')
+                if data['next_change_id'] == change_id:
+                    # an empty page at the head of the river
+                    self.metrics.set_change_id(current=change_id, head=change_id)
+                else:
+                    self.metrics.set_change_id(current=change_id)
+                return data
+            print("No page for id %s (%s), retry in %.1f seconds" % (change_id, self.scheduler.metrics['last_reason'],
+                                                                     self.scheduler.delay))
+
+    def parse_page(self, data, change_id):
+        # turn one page into the list of priced items we store
+        self.metrics.inc('items_seen', sum(len(account['items']) for account in data['stashes']))
+        with self.metrics.timer('normalize'):
+            temp = self.normalize_page(data, change_id)
+        self.metrics.inc('items_kept', len(temp))
+        return temp
+
+    def normalize_page(self, data, change_id):
+        if self.parser is not None:
+            return self.parser.parse_page(data, change_id, self.registry, self.prefilter, self.keep_original)
         temp = []
         for account in data['stashes']:
             # player with public stashes and has items
             if account['public'] != False and len(account['items']) != 0:
-                # items has note
+                # items with a price note, in the leagues and frame types we want
                 for item in account['items']:
-                    if 'note' in item:
-                        item['owner'] = account['accountName']
-                        # set the value into int
-                        if 'requirements' in item:
-                            temp_req = {}
-                            for req in item['requirements']:
-                                req['values'] = int(req['values'][0][0])
-                                temp_req[req['name']] = req['values']
-                            item['requirements'] = temp_req
-
-                        # set the value into float
-                        if 'properties' in item:
-                            temp_prop = {}
-                            for prop in item['properties']:
-                                if len(prop['values']) >= 1:
-                                    if "%" in prop['values'][0][0]:
-                                        prop['values'] = float(prop['values'][0][0][:-1])
-                                        temp_prop[prop['name']] = prop['values']
-                                    elif "-" in prop['values'][0][0]:
-                                        atk = [float(n) for n in prop['values'][0][0].split('-')]
-                                        prop['values'] = sum(atk) / len(atk)
-                                        temp_prop[prop['name']] = prop['values']
-                                    else:
-                                        try:
-                                            prop['values'] = float(prop['values'][0][0])
-                                            temp_prop[prop['name']] = prop['values']
-                                        except:
-                                            prop['values'] = prop['values'][0][0]
-                                            temp_prop[prop['name']] = prop['values']
-                            item['properties'] = temp_prop
-
-                        # set the socket into the format that we actually want
-                        if 'sockets' in item:
-                            group = {}
-                            socket = 0
-                            D = 0
-                            S = 0
-                            I = 0
-                            other = 0
-                            group_ans = []
-                            for n in item['sockets']:
-                                socket += 1
-                                if n['group'] in group:
-                                    group[n['group']] += 1
-                                else:
-                                    group[n['group']] = 1
-                                group_ans = [count_link[1] for count_link in group.items()]
-                                if n['attr'] == 'D':
-                                    D += 1
-                                elif n['attr'] == 'S':
-                                    S += 1
-                                elif n['attr'] == 'I':
-                                    I += 1
-                                else:
-                                    other += 1
-                            item['sockets'] = {'link': group_ans, 'socket_number': socket, 'D': D, 'S': S, 'I': I,
-                                               'Other': 0}
-
-                        # parsing the mods
-                        temp_mods = {"Original":[]}
-                        if 'implicitMods' in item:
-                            for n in item['implicitMods']:
-                                temp_number = re.findall("\d+\.*\d*", n)
-                                temp_number = [float(n) for n in temp_number]
-                                temp_string = re.sub("\d+\.*\d*", "X", n)
-                                if len(temp_number) == 0:
-                                    temp_mods[temp_string] = 1
-                                else:
-                                    temp_mods[temp_string] = sum(temp_number) / len(temp_number)
-                                temp_mods["Original"].append(n)
-                            item.pop('implicitMods', None)
-
-                        if 'craftedMods' in item:
-                            for n in item['craftedMods']:
-                                temp_number = re.findall("\d+\.*\d*", n)
-                                temp_number = [float(n) for n in temp_number]
-                                temp_string = re.sub("\d+\.*\d*", "X", n)
-                                if len(temp_number) == 0:
-                                    temp_mods[temp_string] = 1
-                                else:
-                                    temp_mods[temp_string] = sum(temp_number) / len(temp_number)
-                                temp_mods["Original"].append(n)
-                            item.pop('craftedMods', None)
-
-                        if 'explicitMods' in item:
-                            for n in item['explicitMods']:
-                                temp_number = re.findall("\d+\.*\d*", n)
-                                temp_number = [float(n) for n in temp_number]
-                                temp_string = re.sub("\d+\.*\d*", "X", n)
-                                if len(temp_number) == 0:
-                                    temp_mods[temp_string] = 1
-                                else:
-                                    temp_mods[temp_string] = sum(temp_number) / len(temp_number)
-                                temp_mods["Original"].append(n)
-                            item.pop('explicitMods', None)
-
-                        item['Mods'] = temp_mods
-
-                        # Parse name
-                        item['name'] = item['name'].replace("<<set:MS>><<set:M>><<set:S>>", "").strip()
-                        item['typeLine'] = item['typeLine'].replace("<<set:MS>><<set:M>><<set:S>>", "").strip()
-                        item['name'] = item['name'] + " " + item['typeLine']
-                        item['name'] = item['name'].strip()
-
-                        # Parse type
-                        temp_type = item['icon'].split('2DItems')
-                        if len(temp_type) == 1:
-                            item['type'] = 'Flask'
-                        else:
-                            temp_type = temp_type[1].split('/')[1:]
-                            if temp_type[0] in ['Amulets', 'Rings', 'Maps', 'Gems', 'Quivers', 'Belts', 'Jewels',
-                                                'Currency', 'Divination']:
-                                item['type'] = temp_type[0]
-                            elif temp_type[0] == 'Armours':
-                                item['type'] = temp_type[1]
-                            else:
-                                item['type'] = temp_type[2]
-
-                        # add the idx for the data
-                        item['idx'] = self.user_id
-
-                        # Parse currency
-                        price = re.findall("\d+\.*\d*", item['note'])
-                        if len(price) != 0:
-                            price = float(price[0])
-                            currency = item['note'].split(' ')[-1]
-                            if currency.lower() in ["exa", "chaos", "alt", "divine", "jew", "fuse", "regret", "alch",
-                                                  "gcp", "vaal", "chance", "chisel", "chrom", "scour", "ex", "regal",
-                                                  "exalt", "blessed", "exalted"]:
-                                item.pop('note', None)
-                                item['Price'] = {'Currency': currency, 'Number': price}
-                                temp.append(item)
-
-        if len(temp) != 0:
-            client = MongoClient('mongodb://localhost:27017/')
-            db = client.project_542
-            posts = db.posts
-            posts.insert_many(temp)
-            print('Now MongoDB has %8i documents' % posts.count())
-            print("==================")
-
-        self.record_last_user_id(file_name)
-        self.user_id = file_name
-        # for n in temp:
-        #    with open(os.getcwd() + '/data/' + self.user_id + '.json', 'a') as outfile:
-        #        json.dump(n, outfile, indent=2)
+                    if self.prefilter.accept(item):
+                        item = normalize_item(item, account['accountName'], account['id'], change_id,
+                                              self.registry, self.keep_original)
+                        if item is not None:
+                            temp.append(item)
+        return temp
+
+    def stash_snapshot(self, data, temp):
+        # {stash id: ids of the priced items we kept}, private and emptied stashes have no items left
+        snapshot = {account['id']: set() for account in data['stashes']}
+        for item in temp:
+            snapshot[item.stash_id].add(item.id)
+        return snapshot
+
+    def insert_items(self, temp, next_id, snapshot=None):
+        # the mapping is saved first, the batch may refer to new mod ids
+        if self.registry is not None:
+            self.registry.save()
+        self.writer.add(temp, next_id, snapshot)
+
+
+def argument_parser(description):
+    # the options shared by poe_api.py and pipeline.py
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--keep-original', action='store_true',
+                        help='also store every api item as compressed json, for the exact mod lines')
+    parser.add_argument('--streaming', action='store_true',
+                        help='decode the pages one stash at a time, for a lower peak memory')
+    parser.add_argument('--mode', choices=['insert', 'upsert'], default='insert',
+                        help='append every listing, or keep one document per item id')
+    parser.add_argument('--track-stashes', nargs='?', const='delete', choices=['delete', 'inactive'], default=None,
+                        help='remove the items that left their stash, or set active: false on them')
+    parser.add_argument('--archive', metavar='DIR', default=None, help='keep every raw page compressed in DIR')
+    parser.add_argument('--workers', metavar='N', type=int, default=None,
+                        help='normalize the items on a pool of N processes')
+    parser.add_argument('--league', dest='leagues', action='append', default=None,
+                        help='only keep the items of this league, can be given several times')
+    parser.add_argument('--frame-type', dest='frame_types', type=int, action='append', default=None,
+                        help='only keep the items of this frame type, can be given several times')
+    parser.add_argument('--mod-registry', action='store_true',
+                        help='store the mods with the small id of their template, kept in mod_templates')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve the metrics in the prometheus text format on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--stats-file', default=None, help='rewrite the metrics to this json file')
+    parser.add_argument('--stats-interval', type=float, default=10, help='seconds between two stats files')
+    parser.add_argument('--head-url', default=NINJA_STATS_URL,
+                        help='json with the newest change id as next_change_id, for the lag against the head')
+    parser.add_argument('--head-interval', type=float, default=60, help='seconds between two head requests')
+    return parser
+
+
+def crawler_from_args(args):
+    # the crawler the command line asks for
+    tracker = stash_tracker(remove=args.track_stashes) if args.track_stashes is not None else None
+    writer = bulk_writer(mode=args.mode, tracker=tracker)
+    return get_data_api(writer=writer, registry=mod_registry(writer.db.mod_templates) if args.mod_registry else None,
+                        parser=parallel_parser(workers=args.workers) if args.workers is not None else None,
+                        archive=raw_archive(args.archive) if args.archive is not None else None,
+                        prefilter=item_prefilter(leagues=args.leagues, frame_types=args.frame_types),
+                        streaming=args.streaming, keep_original=args.keep_original)
+
+
+def close_crawler(a):
+    # write what is still buffered and move the checkpoint, then stop the pool and close the archive
+    try:
+        a.writer.close()
+    finally:
+        if a.parser is not None:
+            a.parser.close()
+        if a.archive is not None:
+            a.archive.close()
+
+
+def start_metrics(metrics, args):
+    # the endpoint and the stats file, the head is only followed when one of them shows the lag
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+        print("Metrics on http://127.0.0.1:%i/metrics" % args.metrics_port)
+    if args.stats_file is not None:
+        metrics.write_every(args.stats_file, args.stats_interval)
+    if (args.metrics_port is not None or args.stats_file is not None) and args.head_url:
+        metrics.follow_head(head_from_url(args.head_url), args.head_interval)
 
 
 if __name__ == "__main__":
     # notice, if we try too many times, the server will reject our request then reponed nothing
+    args = argument_parser("Crawl the public stash river into MongoDB").parse_args()
     print("Start the script")
-    a = get_data_api()
+    a = crawler_from_args(args)
+    start_metrics(a.metrics, args)
     times = 1
-    while times != 0:
-        a.get_api_response()
+    try:
+        while times != 0:
+            a.get_api_response()
+    finally:
+        close_crawler(a)
@@ -0,0 +1,45 @@
+from price_parser import parse_price
+from collections import Counter
+
+
+class item_prefilter:
+    """
+    throw away the items we would not store before any normalization is done
+    :param leagues: only keep the items of these leagues, None for every league
+    :param frame_types: only keep these frame types (0 normal, 1 magic, 2 rare, 3 unique, ...), None for all
+    :param require_price: only keep the items with a price note in a currency we understand
+    the dropped items are counted per reason in self.dropped
+    """
+
+    def __init__(self, leagues=None, frame_types=None, require_price=True):
+        self.leagues = set(leagues) if leagues is not None else None
+        self.frame_types = set(frame_types) if frame_types is not None else None
+        self.require_price = require_price
+        self.kept = 0
+        self.dropped = Counter()
+
+    def reject(self, item):
+        # the reason to drop the item, None to keep it
+        if self.require_price:
+            if 'note' not in item:
+                return 'no_note'
+            if parse_price(item['note']) is None:
+                return 'no_price'
+        if self.leagues is not None and item.get('league') not in self.leagues:
+            return 'league'
+        if self.frame_types is not None and item.get('frameType') not in self.frame_types:
+            return 'frame_type'
+        return None
+
+    def accept(self, item):
+        reason = self.reject(item)
+        if reason is None:
+            self.kept += 1
+            return True
+        self.dropped[reason] += 1
+        return False
+
+    def stats(self):
+        temp = dict(self.dropped)
+        temp['kept'] = self.kept
+        return temp
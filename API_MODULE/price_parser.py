@@ -0,0 +1,66 @@
+from functools import lru_cache
+import json
+import os
+import re
+
+# ~b/o 1/2 exa, ~price 10 chaos, ~c/o 2.5exalted
+PRICE = re.compile(r"^\s*~(?P<kind>b/o|price|c/o)\s+(?P<amount>\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?|\.\d+)\s*"
+                   r"(?P<currency>[a-z'\-]+)\s*$", re.IGNORECASE)
+
+# every spelling we see in the notes -> the name we store, the same names as the currency icons of the search
+ALIASES = {"chaos": "chaos", "c": "chaos",
+           "exa": "exa", "ex": "exa", "exalt": "exa", "exalted": "exa", "exalts": "exa",
+           "alt": "alt", "alts": "alt", "alteration": "alt",
+           "divine": "divine", "div": "divine",
+           "jew": "jew", "jewellers": "jew", "jeweller": "jew",
+           "fuse": "fuse", "fus": "fuse", "fusing": "fuse", "fuses": "fuse", "fusings": "fuse",
+           "regret": "regret", "regrets": "regret",
+           "alch": "alch", "alchemy": "alch", "alchs": "alch",
+           "gcp": "gcp", "gemcutter": "gcp", "gemcutters": "gcp", "gem": "gcp",
+           "vaal": "vaal",
+           "chance": "chance",
+           "chisel": "chisel", "chisels": "chisel", "cartographer": "chisel",
+           "chrom": "chrom", "chrome": "chrom", "chromatic": "chrom", "chromatics": "chrom",
+           "scour": "scour", "scouring": "scour",
+           "regal": "regal", "regals": "regal",
+           "blessed": "blessed", "bless": "blessed"}
+
+# chaos orbs per unit, overwritten by currency_rates.json next to this file if it exists
+RATES = {"chaos": 1.0, "exa": 60.0, "divine": 12.0, "alt": 1.0 / 15, "jew": 1.0 / 12, "fuse": 0.5,
+         "regret": 1.0, "alch": 0.3, "gcp": 1.0, "vaal": 1.0, "chance": 1.0 / 8, "chisel": 1.0 / 3,
+         "chrom": 1.0 / 13, "scour": 0.5, "regal": 1.0, "blessed": 0.5}
+
+
+def load_rates(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'currency_rates.json')):
+    if os.path.exists(path):
+        with open(path) as json_data:
+            RATES.update(json.load(json_data))
+
+
+@lru_cache(maxsize=4096)
+def parse_price(note):
+    """
+    :param note: the note of the item, for example "~b/o 1/2 exa"
+    :return: (kind, amount, currency) like ("b/o", 0.5, "exa"), None if it is not a price we understand
+    """
+    m = PRICE.match(note)
+    if m is None:
+        return None
+    currency = ALIASES.get(m.group('currency').lower())
+    if currency is None:
+        return None
+    amount = m.group('amount').split('/')
+    if len(amount) == 2:
+        if float(amount[1]) == 0:
+            return None
+        amount = float(amount[0]) / float(amount[1])
+    else:
+        amount = float(amount[0])
+    return m.group('kind').lower(), amount, currency
+
+
+def chaos_value(amount, currency):
+    return amount * RATES[currency]
+
+
+load_rates()
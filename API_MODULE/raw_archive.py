@@ -0,0 +1,78 @@
+import gzip
+import json
+import os
+
+
+class raw_archive:
+    """
+    append every raw page to gzip compressed segment files, a new segment is started at segment_size bytes
+    every page is its own gzip member, so a segment is still a normal .gz file for zcat
+    index.jsonl maps each change id to its segment, offset and length for random access
+    """
+
+    def __init__(self, folder='archive', segment_size=256 * 1024 * 1024, level=6):
+        self.folder = folder
+        self.segment_size = segment_size
+        self.level = level
+        self.index = {}
+        self.order = []
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self.index_path = os.path.join(folder, 'index.jsonl')
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    # a line cut by a crash is dropped, its page is written again
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.add(entry)
+        self.segment = max([n['segment'] for n in self.order] or [0])
+        self.index_file = open(self.index_path, 'a')
+
+    def add(self, entry):
+        if entry['change_id'] not in self.index:
+            self.order.append(entry)
+        self.index[entry['change_id']] = entry
+
+    def segment_path(self, segment):
+        return os.path.join(self.folder, 'segment-%05i.gz' % segment)
+
+    def write(self, change_id, next_change_id, raw):
+        """
+        :param change_id: the id the page was asked with
+        :param next_change_id: the next id in the page
+        :param raw: the page as bytes, as it came from the api
+        """
+        if change_id in self.index:
+            return
+        path = self.segment_path(self.segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_size:
+            self.segment += 1
+            path = self.segment_path(self.segment)
+        member = gzip.compress(raw, self.level)
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+        # the index line goes last, a page is only found once all of it is on disk
+        entry = {'change_id': change_id, 'next_change_id': next_change_id, 'segment': self.segment,
+                 'offset': offset, 'length': len(member), 'raw_length': len(raw)}
+        self.index_file.write(json.dumps(entry) + '\n')
+        self.index_file.flush()
+        self.add(entry)
+
+    def read(self, change_id):
+        entry = self.index[change_id]
+        with open(self.segment_path(entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            return gzip.decompress(f.read(entry['length']))
+
+    def iter_pages(self, change_id='0'):
+        # the pages in the order they were written, starting from change_id
+        start = self.order.index(self.index[change_id])
+        for entry in self.order[start:]:
+            yield entry['change_id'], json.loads(self.read(entry['change_id']).decode('utf-8'))
+
+    def close(self):
+        self.index_file.close()
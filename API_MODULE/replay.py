@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from item_parser import normalize_item
+from prefilter import item_prefilter
+import json
+import glob
+import os
+import sys
+import time
+
+
+def iter_json_objects(path, chunk_size=1 << 16):
+    """
+    read the archived files object by object without loading the whole file
+    they hold pretty printed json objects one after another, separated by commas
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+    with open(path) as f:
+        while True:
+            pos = 0
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in ',[]'):
+                pos += 1
+            buf = buf[pos:]
+            if len(buf) == 0 and eof:
+                return
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = len(chunk) == 0
+                buf += chunk
+                continue
+            yield obj
+            buf = buf[end:]
+
+
+def replay_file(path, uri='mongodb://localhost:27017/', db_name='project_542', batch_size=1000, prefilter=None):
+    # runs in a worker process, every worker has its own client
+    from mongo_writer import bulk_writer
+    if prefilter is None:
+        prefilter = item_prefilter()
+    writer = bulk_writer(uri=uri, db_name=db_name, batch_size=batch_size, max_wait=float('inf'))
+    change_id = os.path.splitext(os.path.basename(path))[0]
+    seen = 0
+    kept = 0
+    for item in iter_json_objects(path):
+        seen += 1
+        if prefilter.accept(item):
+            item = normalize_item(item, item.get('owner'), item.get('stash_id'), change_id)
+            if item is not None:
+                kept += 1
+                writer.add([item], change_id)
+    writer.close()
+    return path, seen, kept, writer.inserted, prefilter.stats()
+
+
+def replay(paths, workers=None, **kwargs):
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(replay_file, path, **kwargs) for path in paths]
+        for future in futures:
+            path, seen, kept, inserted, dropped = future.result()
+            print("%s: %i items, %i priced, %i inserted, filter: %s" % (path, seen, kept, inserted, dropped))
+    print("Replayed %i files in %.1f seconds" % (len(paths), time.time() - start))
+
+
+if __name__ == "__main__":
+    # python replay.py [file or folder ...], the data folder by default
+    paths = []
+    for arg in sys.argv[1:] or ['data']:
+        if os.path.isdir(arg):
+            paths += sorted(glob.glob(os.path.join(arg, '*.json')))
+        else:
+            paths.append(arg)
+    replay(paths)
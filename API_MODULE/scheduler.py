@@ -0,0 +1,130 @@
+from email.utils import parsedate_tz, mktime_tz
+import random
+import time
+
+
+def retry_after_seconds(value, now=None):
+    """
+    :param value: the Retry-After header, a number of seconds or an http date
+    :return: the seconds to wait, None if there is no header or it cannot be read
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, mktime_tz(date) - (now if now is not None else time.time()))
+
+
+class rate_limit_scheduler:
+    """
+    decide how long the crawler waits before the next request
+    - Retry-After and the X-Rate-Limit-* headers from the api win over everything else
+    - failed requests back off exponentially with full jitter
+    - empty pages at the head of the river are polled with a growing interval
+    """
+
+    def __init__(self, min_poll=1.0, max_poll=30.0, poll_growth=1.5, base_backoff=2.0, max_backoff=300.0,
+                 safety=0.9, sleep=time.sleep):
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.poll_growth = poll_growth
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # start spreading requests out once this share of a rate limit window is used
+        self.safety = safety
+        self.sleep = sleep
+        self.delay = 0.0
+        self.poll_interval = min_poll
+        self.failures = 0
+        self.metrics = {'requests': 0, 'pages': 0, 'empty_pages': 0, 'errors': 0, 'throttled': 0,
+                        'rate_limited': 0, 'slept_seconds': 0.0, 'last_delay': 0.0, 'last_reason': 'start'}
+
+    def wait(self):
+        if self.delay > 0:
+            self.sleep(self.delay)
+            self.metrics['slept_seconds'] += self.delay
+        self.delay = 0.0
+
+    def decide(self, delay, reason):
+        self.delay = delay
+        self.metrics['last_delay'] = delay
+        self.metrics['last_reason'] = reason
+
+    def backoff(self):
+        self.failures += 1
+        cap = min(self.max_backoff, self.base_backoff * 2 ** (self.failures - 1))
+        return random.uniform(0, cap)
+
+    def record_error(self):
+        # the request itself failed, or the body was not json
+        self.metrics['requests'] += 1
+        self.metrics['errors'] += 1
+        self.decide(self.backoff(), 'error')
+
+    def record_response(self, r, data, change_id):
+        """
+        :param r: the http response
+        :param data: the decoded page, None if it could not be decoded
+        :param change_id: the id we asked for
+        :return: True if the page can be used
+        """
+        self.metrics['requests'] += 1
+        retry_after = r.headers.get('Retry-After')
+        if r.status_code == 429 or (retry_after is not None and r.status_code >= 400):
+            self.metrics['throttled'] += 1
+            self.failures += 1
+            seconds = retry_after_seconds(retry_after)
+            if seconds is not None:
+                self.decide(seconds, 'retry-after')
+            else:
+                self.decide(self.backoff(), 'throttled')
+            return False
+        if r.status_code != 200 or data is None or 'next_change_id' not in data:
+            self.metrics['errors'] += 1
+            self.decide(self.backoff(), 'error')
+            return False
+
+        self.failures = 0
+        self.metrics['pages'] += 1
+        limit_delay = self.rate_limit_delay(r.headers)
+        if len(data.get('stashes', [])) == 0 or data['next_change_id'] == change_id:
+            # nothing new yet, ask again later and a bit slower each time
+            self.metrics['empty_pages'] += 1
+            self.decide(max(self.poll_interval, limit_delay), 'empty-page')
+            self.poll_interval = min(self.max_poll, self.poll_interval * self.poll_growth)
+        else:
+            self.poll_interval = self.min_poll
+            if limit_delay > 0:
+                self.decide(limit_delay, 'rate-limit')
+            else:
+                self.decide(0.0, 'ok')
+        return True
+
+    def rate_limit_delay(self, headers):
+        """
+        the api sends the rules as "max_hits:period:penalty,..."
+        and the current state as "hits:period:active_penalty,..."
+        """
+        delay = 0.0
+        for name in headers:
+            if not name.lower().startswith('x-rate-limit-') or name.lower().endswith('-state') \
+                    or name.lower() in ['x-rate-limit-policy', 'x-rate-limit-rules']:
+                continue
+            state = headers.get(name + '-State')
+            if state is None:
+                continue
+            for rule, current in zip(headers[name].split(','), state.split(',')):
+                max_hits, period = [float(n) for n in rule.split(':')[:2]]
+                hits, _, penalty = [float(n) for n in current.split(':')[:3]]
+                if penalty > 0:
+                    self.metrics['rate_limited'] += 1
+                    delay = max(delay, penalty)
+                elif hits >= max_hits * self.safety:
+                    # close to the limit, spread the rest of the window evenly
+                    delay = max(delay, period / max_hits)
+        return delay
@@ -0,0 +1,31 @@
+# socket attribute in the api -> the colour we store, abyss sockets stay A
+COLOURS = {'S': 'R', 'D': 'G', 'I': 'B', 'G': 'W', 'A': 'A'}
+# the order of the colours inside a group, the search server enumerates the groups in the same order
+ORDER = 'RGBWA'
+
+
+def canonical_group(colours):
+    # "GRR" -> "RRG"
+    return ''.join(sorted(colours, key=ORDER.index))
+
+
+def parse_sockets(sockets):
+    """
+    :param sockets: the sockets list of the api item, [{'group': 0, 'attr': 'S'}, ...]
+    :return: {'max_link', 'socket_number', 'pattern', 'groups', 'link', 'D', 'S', 'I', 'Other'}
+             groups are the linked groups as canonical colour strings ["RRG", "B"], biggest first,
+             pattern is them joined with "-", "RRG-B"
+    """
+    group = {}
+    count = {'D': 0, 'S': 0, 'I': 0, 'Other': 0}
+    for n in sockets:
+        group.setdefault(n['group'], []).append(COLOURS.get(n['attr'], 'W'))
+        if n['attr'] in count:
+            count[n['attr']] += 1
+        else:
+            count['Other'] += 1
+    groups = sorted((canonical_group(n) for n in group.values()), key=lambda n: (-len(n), [ORDER.index(c) for c in n]))
+    temp = {'max_link': len(groups[0]) if groups else 0, 'socket_number': len(sockets), 'pattern': '-'.join(groups),
+            'groups': groups, 'link': [len(n) for n in groups]}
+    temp.update(count)
+    return temp
@@ -0,0 +1,148 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+from replay import iter_json_objects
+import threading
+import time
+import json
+import gzip
+import os
+import sys
+
+
+def load_items(path):
+    return list(iter_json_objects(path))
+
+
+def build_pages(data_dir, stashes_per_page=5):
+    # group the archived items back into one stash per owner, then cut the stashes into pages
+    stashes = {}
+    for file_name in sorted(os.listdir(data_dir)):
+        if file_name.endswith('.json'):
+            for item in load_items(os.path.join(data_dir, file_name)):
+                owner = item.get('owner', 'unknown')
+                if owner not in stashes:
+                    stashes[owner] = {'id': 'stash-' + owner, 'accountName': owner, 'public': True,
+                                      'stash': owner, 'items': []}
+                stashes[owner]['items'].append(item)
+    stashes = list(stashes.values())
+    pages = {}
+    for n in range(0, len(stashes), stashes_per_page):
+        idx = n // stashes_per_page
+        pages[str(idx)] = {'next_change_id': str(idx + 1), 'stashes': stashes[n:n + stashes_per_page]}
+    # the head of the river keeps answering with an empty page and the same id
+    last = str(len(pages))
+    pages[last] = {'next_change_id': last, 'stashes': []}
+    return pages
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.startswith('/throttle'):
+            # make the next n stash requests fail with 429 and the given Retry-After
+            self.server.throttle(int(query.get('n', ['1'])[0]), query.get('retry_after', ['1'])[0])
+            self.send_empty(204)
+            return
+        if url.path.startswith('/stats'):
+            # the head of the river, like the stats of poe.ninja
+            self.send_json({'next_change_id': str(len(self.server.pages) - 1)})
+            return
+        if not url.path.startswith('/public-stash-tabs'):
+            self.send_error(404)
+            return
+        hits = self.server.hit()
+        rule = '%i:%i:%i' % (self.server.max_hits, self.server.period, self.server.period)
+        state = '%i:%i:0' % (hits, self.server.period)
+        retry_after = self.server.take_throttle()
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header('Retry-After', retry_after)
+            self.send_header('X-Rate-Limit-Ip', rule)
+            self.send_header('X-Rate-Limit-Ip-State', '%i:%i:%s' % (hits, self.server.period, retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        change_id = query.get('id', ['0'])[0]
+        pages = self.server.pages
+        page = pages.get(change_id, pages[str(len(pages) - 1)])
+        body = json.dumps(page).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Rate-Limit-Ip', rule)
+        self.send_header('X-Rate-Limit-Ip-State', state)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, doc):
+        body = json.dumps(doc).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_empty(self, code):
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """
+    a local copy of the public stash api that serves the pages rebuilt from API_MODULE/data
+    """
+    daemon_threads = True
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, data_dir=None, port=0, stashes_per_page=5, max_hits=45, period=60):
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+        self.pages = build_pages(data_dir, stashes_per_page)
+        self.max_hits = max_hits
+        self.period = period
+        self.hits = []
+        self.throttled = []
+        self.lock = threading.Lock()
+        HTTPServer.__init__(self, ('127.0.0.1', port), StandInHandler)
+
+    def hit(self):
+        # the number of requests inside the current rate limit window, reported in X-Rate-Limit-Ip-State
+        with self.lock:
+            now = time.time()
+            self.hits = [n for n in self.hits if now - n < self.period] + [now]
+            return len(self.hits)
+
+    def throttle(self, n, retry_after):
+        with self.lock:
+            self.throttled = [str(retry_after)] * n
+
+    def take_throttle(self):
+        with self.lock:
+            if self.throttled:
+                return self.throttled.pop()
+            return None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:%i/public-stash-tabs/?id=' % self.server_address[1]
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return t
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = StandInServer(port=port)
+    print("Serving %i pages on %s" % (len(server.pages), server.base_url))
+    server.serve_forever()
@@ -0,0 +1,47 @@
+from pymongo import DeleteMany, UpdateMany
+
+
+class stash_tracker:
+    """
+    every stash in the api is a full snapshot, the priced items that are no longer in it were sold or delisted
+    keep the item ids of every stash we have seen and remove the vanished ones from the collection
+    remove='delete' deletes them, remove='inactive' sets active: False on them
+    """
+
+    def __init__(self, remove='delete'):
+        self.remove = remove
+        self.items = {}
+        # stash id -> the latest item ids, only the newest snapshot of a stash in a batch counts
+        self.pending = {}
+        # the ids that left their stash since the last operations(), the writer forgets their digest
+        self.vanished = set()
+        self.removed = 0
+
+    def update(self, snapshot):
+        """
+        :param snapshot: {stash id: set of the priced item ids in it}, empty for private stashes
+        """
+        for stash_id, ids in snapshot.items():
+            old = self.items.get(stash_id)
+            # a stash we have not seen since the start may still have items in the collection
+            if old is None or not old <= ids or stash_id in self.pending:
+                self.pending[stash_id] = ids
+            if old is not None:
+                self.vanished |= old - ids
+            if len(ids) != 0:
+                self.items[stash_id] = ids
+            else:
+                self.items.pop(stash_id, None)
+
+    def operations(self):
+        # run after the items of the batch are written, so the newest snapshot of every stash wins
+        temp = []
+        for stash_id, ids in self.pending.items():
+            query = {'stash_id': stash_id, 'id': {'$nin': list(ids)}}
+            if self.remove == 'delete':
+                temp.append(DeleteMany(query))
+            else:
+                query['active'] = {'$ne': False}
+                temp.append(UpdateMany(query, {'$set': {'active': False}}))
+        self.pending = {}
+        return temp
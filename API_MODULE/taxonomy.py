@@ -0,0 +1,151 @@
+from functools import lru_cache
+import base64
+import binascii
+import re
+
+# category id -> (name, parent id), the names are the item types of the search page
+CATEGORIES = {"weapon": ("Weapons", None),
+              "weapon.one": ("One Hand", "weapon"),
+              "weapon.one.claw": ("Claw", "weapon.one"),
+              "weapon.one.dagger": ("Dagger", "weapon.one"),
+              "weapon.one.axe": ("One Hand Axe", "weapon.one"),
+              "weapon.one.mace": ("One Hand Mace", "weapon.one"),
+              "weapon.one.sword": ("One Hand Sword", "weapon.one"),
+              "weapon.one.sceptre": ("Sceptre", "weapon.one"),
+              "weapon.one.wand": ("Wand", "weapon.one"),
+              "weapon.two": ("Two Hand", "weapon"),
+              "weapon.two.bow": ("Bow", "weapon.two"),
+              "weapon.two.staff": ("Staff", "weapon.two"),
+              "weapon.two.axe": ("Two Hand Axe", "weapon.two"),
+              "weapon.two.mace": ("Two Hand Mace", "weapon.two"),
+              "weapon.two.sword": ("Two Hand Sword", "weapon.two"),
+              "weapon.rod": ("Fishing Rods", "weapon"),
+              "armour": ("Armour", None),
+              "armour.body": ("Body Armour", "armour"),
+              "armour.boots": ("Boots", "armour"),
+              "armour.gloves": ("Gloves", "armour"),
+              "armour.helmet": ("Helmet", "armour"),
+              "armour.shield": ("Shield", "armour"),
+              "armour.quiver": ("Quiver", "armour"),
+              "accessory": ("Accessories", None),
+              "accessory.amulet": ("Amulet", "accessory"),
+              "accessory.ring": ("Ring", "accessory"),
+              "accessory.belt": ("Belt", "accessory"),
+              "flask": ("Flask", None),
+              "gem": ("Gem", None),
+              "gem.skill": ("Skill Gem", "gem"),
+              "gem.support": ("Support Gem", "gem"),
+              "jewel": ("Jewel", None),
+              "map": ("Map", None),
+              "map.fragment": ("Map Fragments", "map"),
+              "card": ("Divination Card", None),
+              "leaguestone": ("Leaguestone", None),
+              "prophecy": ("Prophecy", None),
+              "currency": ("Currency", None),
+              "currency.essence": ("Essence", "currency"),
+              "currency.breach": ("Breach", "currency")}
+
+# the folder of the icon under Art/2DItems -> category id, the longest folder that matches wins
+FOLDERS = {"Weapons/OneHandWeapons/Claws": "weapon.one.claw",
+           "Weapons/OneHandWeapons/Daggers": "weapon.one.dagger",
+           "Weapons/OneHandWeapons/OneHandAxes": "weapon.one.axe",
+           "Weapons/OneHandWeapons/OneHandMaces": "weapon.one.mace",
+           "Weapons/OneHandWeapons/OneHandSwords": "weapon.one.sword",
+           "Weapons/OneHandWeapons/Rapiers": "weapon.one.sword",
+           "Weapons/OneHandWeapons/Scepters": "weapon.one.sceptre",
+           "Weapons/OneHandWeapons/Wands": "weapon.one.wand",
+           "Weapons/OneHandWeapons": "weapon.one",
+           "Weapons/TwoHandWeapons/Bows": "weapon.two.bow",
+           "Weapons/TwoHandWeapons/Staves": "weapon.two.staff",
+           "Weapons/TwoHandWeapons/TwoHandAxes": "weapon.two.axe",
+           "Weapons/TwoHandWeapons/TwoHandMaces": "weapon.two.mace",
+           "Weapons/TwoHandWeapons/TwoHandSwords": "weapon.two.sword",
+           "Weapons/TwoHandWeapons/FishingRods": "weapon.rod",
+           "Weapons/TwoHandWeapons": "weapon.two",
+           "Weapons": "weapon",
+           "Armours/BodyArmours": "armour.body",
+           "Armours/Boots": "armour.boots",
+           "Armours/Gloves": "armour.gloves",
+           "Armours/Helmets": "armour.helmet",
+           "Armours/Shields": "armour.shield",
+           "Armours": "armour",
+           "Quivers": "armour.quiver",
+           "Amulets": "accessory.amulet",
+           "Rings": "accessory.ring",
+           "Belts": "accessory.belt",
+           "Flasks": "flask",
+           "Gems/Support": "gem.support",
+           "Gems": "gem.skill",
+           "Jewels": "jewel",
+           "Maps/Fragments": "map.fragment",
+           "Maps": "map",
+           "Divination": "card",
+           "Leaguestones": "leaguestone",
+           "Currency/Essence": "currency.essence",
+           "Currency/Breach": "currency.breach",
+           "Currency": "currency"}
+
+# frame types of the api that are enough on their own
+FRAME_TYPES = {4: "gem.skill", 6: "card", 8: "prophecy"}
+
+# the art path inside the serialized data of a generated icon, "Art/2DItems/Flasks/lifeflask8"
+GENERATED = re.compile(r'Art/2DItems/([^"]+)')
+
+
+def art_folder(icon):
+    """
+    :param icon: the icon url of the api item
+    :return: the folder of its art under 2DItems, "Weapons/TwoHandWeapons/Bows", None if unknown
+    generated icons (flasks, ...) carry the art path base64 encoded in the url
+    """
+    path = icon.split('?')[0]
+    if '/gen/image/' in path:
+        pieces = path.split('/gen/image/')[1].split('/')[:-1]
+        try:
+            data = base64.b64decode(''.join(pieces).replace(',', '=')).decode('utf-8', 'replace')
+        except (binascii.Error, ValueError):
+            return None
+        m = GENERATED.search(data)
+        if m is None:
+            return None
+        return '/'.join(m.group(1).split('/')[:-1])
+    if '2DItems/' not in path:
+        return None
+    return '/'.join(path.split('2DItems/')[1].split('/')[:-1])
+
+
+@lru_cache(maxsize=4096)
+def icon_category(icon_path):
+    # one category per icon path, the few thousand art paths are decoded once
+    folder = art_folder(icon_path)
+    while folder:
+        if folder in FOLDERS:
+            return FOLDERS[folder]
+        folder = folder.rpartition('/')[0]
+    return None
+
+
+def ancestors(category):
+    # "weapon.two.bow" -> ["weapon", "weapon.two", "weapon.two.bow"]
+    temp = []
+    while category is not None:
+        temp.insert(0, category)
+        category = CATEGORIES[category][1]
+    return temp
+
+
+def categorize(item):
+    """
+    :param item: the api item
+    :return: (category id, [the category and its ancestors, root first]), (None, []) if unknown
+    """
+    category = icon_category(item['icon'].split('?')[0])
+    if category is None or category == "currency":
+        # the base type or the frame type settles what the icon does not
+        if 'Flask' in item.get('typeLine', ''):
+            category = "flask"
+        elif item.get('frameType') in FRAME_TYPES:
+            category = FRAME_TYPES[item['frameType']]
+    if category is None:
+        return None, []
+    return category, ancestors(category)
@@ -0,0 +1,105 @@
+from stand_in_server import StandInServer
+from http_session import crawler_session
+from scheduler import rate_limit_scheduler, retry_after_seconds
+from checkpoint import checkpoint_store
+from poe_api import get_data_api
+from email.utils import formatdate
+import unittest
+import tempfile
+import os
+
+
+class page_writer:
+    # keeps the pages in memory, get_data_api only needs a writer to hand its checkpoint and metrics to
+    def __init__(self):
+        self.checkpoint = None
+        self.metrics = None
+        self.items = []
+
+    def add(self, items, next_id, snapshot=None):
+        self.items.extend(items)
+
+
+class SchedulerTest(unittest.TestCase):
+    """
+    the scheduler against the throttling stand-in server, python -m unittest test_scheduler
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.session = crawler_session(base_url=self.server.base_url, read_timeout=10)
+        self.slept = []
+        self.scheduler = rate_limit_scheduler(sleep=self.slept.append)
+
+    def tearDown(self):
+        self.session.close()
+
+    def throttle(self, n, retry_after):
+        self.session.session.get(self.server.base_url.split('/public-stash-tabs')[0] + '/throttle',
+                                 params={'n': n, 'retry_after': retry_after})
+
+    def test_retry_after_is_honoured(self):
+        self.throttle(1, 7)
+        r = self.session.get('0')
+        self.assertEqual(r.status_code, 429)
+        self.assertFalse(self.scheduler.record_response(r, None, '0'))
+        self.assertEqual(self.scheduler.delay, 7.0)
+        self.assertEqual(self.scheduler.metrics['throttled'], 1)
+        self.assertEqual(self.scheduler.metrics['last_reason'], 'retry-after')
+
+    def test_page_after_throttle(self):
+        self.throttle(1, 3)
+        r = self.session.get('0')
+        self.scheduler.record_response(r, None, '0')
+        self.scheduler.wait()
+        r = self.session.get('0')
+        self.assertTrue(self.scheduler.record_response(r, r.json(), '0'))
+        self.assertEqual(self.slept, [3.0])
+        self.assertEqual(self.scheduler.metrics['pages'], 1)
+
+    def test_empty_pages_poll_slower(self):
+        head = str(len(self.server.pages) - 1)
+        delays = []
+        for _ in range(3):
+            r = self.session.get(head)
+            self.assertTrue(self.scheduler.record_response(r, r.json(), head))
+            delays.append(self.scheduler.delay)
+        self.assertEqual(self.scheduler.metrics['empty_pages'], 3)
+        self.assertTrue(delays[0] < delays[1] < delays[2])
+
+    def test_retry_after_date(self):
+        self.assertEqual(retry_after_seconds(formatdate(1000.0 + 30, usegmt=True), now=1000.0), 30.0)
+        self.assertEqual(retry_after_seconds('5'), 5.0)
+        self.assertIsNone(retry_after_seconds('soon'))
+        self.assertIsNone(retry_after_seconds(None))
+
+    def crawl_first_page(self, streaming=False):
+        # two 429 with Retry-After: 7, then the page
+        self.throttle(2, 7)
+        with tempfile.TemporaryDirectory() as path:
+            a = get_data_api(session=self.session, scheduler=self.scheduler, writer=page_writer(),
+                             streaming=streaming, checkpoints=checkpoint_store(path=os.path.join(path, 'last_user')))
+            data = a.fetch_page('0')
+        self.assertEqual(data['next_change_id'], '1')
+        self.assertEqual(self.slept, [7.0, 7.0])
+        self.assertEqual(self.scheduler.metrics['throttled'], 2)
+
+    def test_crawler_waits_for_retry_after(self):
+        self.crawl_first_page()
+
+    def test_streaming_crawler_waits_for_retry_after(self):
+        # the empty body of the 429 is a decode error, not an IndexError out of fetch_page
+        self.crawl_first_page(streaming=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,7 +15,13 @@ def CreateApp(config_name):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     db.init_app(app)
+    from api_server.mongo_metrics import mongo_host
+    app.config['MONGO_HOST'] = mongo_host(app.config)
     mongo.init_app(app)
+    if app.config.get('MONGO_ENSURE_INDEXES'):
+        from api_server.mongo_indexes import ensure_indexes
+        with app.app_context():
+            ensure_indexes(mongo.db.posts)
     wtforms_json.init()
     app.register_blueprint(main)
     app.add_url_rule('/', 'index', lambda: app.send_static_file('index.html'))
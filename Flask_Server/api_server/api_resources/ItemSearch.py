@@ -1,18 +1,42 @@
 from flask import request, jsonify, g
-from pymongo import MongoClient, ASCENDING
+from pymongo import ASCENDING, DESCENDING
 from flask_restful import Resource
 from ..forms import ItemQueryForm
 from ..database import Search
-from api_server import db
-from .mongoSearchFormParser import parser
+from api_server import db, mongo
+from .mongoSearchFormParser import parser, mod_stages
 import datetime
+import time
+import json
+import zlib
 from .GetToken import verify_token
 
 
+def mod_line(template, value):
+    """
+    the mod line shown for a template and its stored value, "X% increased Attack Speed", 8 -> "8% increased ..."
+    the value of a range is its average, so "Adds X to X Fire Damage" shows the average after it
+    """
+    value = int(value) if value == int(value) else round(value, 2)
+    if template.count("X") == 1:
+        return template.replace("X", str(value))
+    if template.count("X") > 1:
+        return "%s (average %s)" % (template, value)
+    return template
+
+
 class ItemSearch(Resource):
+    # {mod template: id} written by the crawler's mod_registry, shared by all the requests
+    mod_ids = {}
+    mod_templates = {}
+    mod_ids_time = 0
+    mod_ids_refresh = 60
+    # the indexed numbers the crawler computes, sorted highest first
+    sort_fields = ["pdps", "edps", "dps", "armour", "evasion", "energy_shield"]
+
     def __init__(self):
-        client = MongoClient("mongodb://localhost:27017/")
-        self.db = client.project_542
+        # the pooled client of the app, made once in CreateApp
+        self.db = mongo.db
         self.dic = {"blessed": "http://poe.trade/static/currency/blessed.png",
                     "chisel": "http://poe.trade/static/currency/chisel.png",
                     "chaos": "http://poe.trade/static/currency/chaos.png",
@@ -41,14 +65,28 @@ class ItemSearch(Resource):
         print(request.get_json())
         form = ItemQueryForm.from_json(request.get_json())
         if form.validate_on_submit():
-            query_and = parser(form)
+            query_and = parser(form, self.get_mod_ids())
+            stages = mod_stages(form, self.get_mod_ids())
             print(query_and)
-            posts = self.db.posts.find({"$and": query_and}).limit(50).sort("Price.Number", ASCENDING)
+            if form.sort_by.data in ItemSearch.sort_fields:
+                sort_key, direction = form.sort_by.data, DESCENDING
+            elif any("mods_weight" in n.get("$addFields", {}) for n in stages):
+                # the best weighted sum first
+                sort_key, direction = "mods_weight", DESCENDING
+            elif any("Price.Currency" in n for n in query_and):
+                sort_key, direction = "Price.Number", ASCENDING
+            else:
+                # cheapest first over every currency
+                sort_key, direction = "chaos_value", ASCENDING
+            if stages:
+                # the count and weighted mod groups are computed by the database after the indexed $match
+                posts = self.db.posts.aggregate([{"$match": {"$and": query_and}}] + stages +
+                                                [{"$sort": {sort_key: direction}}, {"$limit": 50}])
+            else:
+                posts = self.db.posts.find({"$and": query_and}).limit(50).sort(sort_key, direction)
             ans = []
             for n in posts:
-                n["_id"] = str(n["_id"])
-                n["Price"]['icon'] = self.dic[n["Price"]['Currency'].lower()]
-                ans.append(n)
+                ans.append(self.display(n))
             if 'Authorization' in request.headers:
                 if verify_token(request.headers['Authorization'].split(" ")[1]) and form.name.data:
                     self.add_to_history(form)
@@ -58,11 +96,36 @@ class ItemSearch(Resource):
             posts = self.db.posts.find().limit(50)
             ans = []
             for n in posts:
-                n["_id"] = str(n["_id"])
-                n["Price"]['icon'] = self.dic[n["Price"]['Currency'].lower()]
-                ans.append(n)
+                ans.append(self.display(n))
             return jsonify(ans)
 
+    def display(self, n):
+        n["_id"] = str(n["_id"])
+        n["Price"]['icon'] = self.dic[n["Price"]['Currency'].lower()]
+        # the exact mod lines are only in the compressed original item, when the crawler kept it
+        if "original" in n:
+            original = json.loads(zlib.decompress(n.pop("original")).decode('utf-8'))
+            n.setdefault("icon", original.get("icon"))
+            n.setdefault("Mods", {})["Original"] = [line for key in ['implicitMods', 'craftedMods', 'explicitMods']
+                                                    for line in original.get(key, [])]
+        elif "mods" in n and "Original" not in n.get("Mods", {}):
+            templates = self.get_mod_templates()
+            n.setdefault("Mods", {})["Original"] = [mod_line(str(templates.get(m["k"], m["k"])), m["v"])
+                                                    for m in n["mods"]]
+        return n
+
+    def get_mod_ids(self):
+        if time.time() - ItemSearch.mod_ids_time > ItemSearch.mod_ids_refresh:
+            ItemSearch.mod_ids = {n['template']: n['_id'] for n in self.db.mod_templates.find()}
+            ItemSearch.mod_templates = {mod_id: template for template, mod_id in ItemSearch.mod_ids.items()}
+            ItemSearch.mod_ids_time = time.time()
+        return ItemSearch.mod_ids
+
+    def get_mod_templates(self):
+        # {id: mod template}, for the items that store the id of the template in mods.k
+        self.get_mod_ids()
+        return ItemSearch.mod_templates
+
     def add_to_history(self, form):
         if form.validate():
             search_history = Search(item=form.name.data, time=datetime.datetime.now(), id=g.user.id)
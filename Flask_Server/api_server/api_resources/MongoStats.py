@@ -0,0 +1,21 @@
+from flask import jsonify, g, current_app
+from flask_restful import Resource
+from ..database import Admin as Admindb
+from ..mongo_metrics import listener
+from .GetToken import auth
+
+
+class MongoStats(Resource):
+    """
+    usage of the pooled MongoClient, only for the admin
+    """
+
+    decorators = [auth.login_required]
+
+    def get(self):
+        """
+        :return: connections in use, the most in use at once, the pool size, commands, failures and latency
+        """
+        if not Admindb.query.filter_by(id=g.user.id).first():
+            return jsonify({"message": "Wrong Page"})
+        return jsonify(listener.stats(current_app.config['MONGO_POOL_SIZE']))
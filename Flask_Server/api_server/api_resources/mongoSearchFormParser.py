@@ -1,13 +1,151 @@
-def parser(form):
-    query_and = []
-    price_name = {"Blessed Orb": "bless",
-                  "Cartographer's Chisel": "chisel", "Chaos Orb": "chaos", "Chromatic Orb": "chrome",
-                  "Divine Orb": "div", "Exalted Orb": "exa", "Gemcutter's Prism": "gem", "Jeweller's Orb": "jew",
+from itertools import combinations_with_replacement
+import re
+
+# the order of the colours inside a group stored by the crawler in sockets.groups, "RRG"
+SOCKET_ORDER = 'RGBWA'
+
+# the item types of the search page -> the category ids of the crawler's taxonomy
+TYPE_CATEGORIES = {"Weapons": "weapon", "One Hand": "weapon.one", "Two Hand": "weapon.two",
+                   "Claw": "weapon.one.claw", "Dagger": "weapon.one.dagger", "One Hand Axe": "weapon.one.axe",
+                   "One Hand Mace": "weapon.one.mace", "One Hand Sword": "weapon.one.sword",
+                   "Sceptre": "weapon.one.sceptre", "Wand": "weapon.one.wand", "Bow": "weapon.two.bow",
+                   "Staff": "weapon.two.staff", "Two Hand Axe": "weapon.two.axe", "Two Hand Mace": "weapon.two.mace",
+                   "Two Hand Sword": "weapon.two.sword", "Fishing Rods": "weapon.rod",
+                   "Armour": "armour", "Body Armour": "armour.body", "Boots": "armour.boots",
+                   "Gloves": "armour.gloves", "Helmet": "armour.helmet", "Shield": "armour.shield",
+                   "Quiver": "armour.quiver", "Accessories": "accessory", "Amulet": "accessory.amulet",
+                   "Ring": "accessory.ring", "Belt": "accessory.belt", "Flask": "flask", "Gem": "gem",
+                   "Jewel": "jewel", "Map": "map", "Map Fragments": "map.fragment", "Divination Card": "card",
+                   "Leaguestone": "leaguestone", "Prophecy": "prophecy", "Currency": "currency",
+                   "Essence": "currency.essence", "Breach": "currency.breach"}
+
+# the words of a name, the same as item_parser.name_keys of the crawler splits the stored names into name_tokens
+NAME_WORD = re.compile(r"[\w']+", re.UNICODE)
+
+
+def linked_groups(linked, min_size=1, max_size=6):
+    """
+    :param linked: the least number of sockets of every colour in the group, {"R": 3, "G": 0, ...}
+    :return: every stored group string of min_size to max_size sockets with at least those colours
+    """
+    temp = []
+    for size in range(max(min_size, sum(linked.values())), max_size + 1):
+        # combinations_with_replacement keeps the order of SOCKET_ORDER, the same order as the crawler
+        for group in combinations_with_replacement(SOCKET_ORDER, size):
+            if all(group.count(colour) >= number for colour, number in linked.items()):
+                temp.append(''.join(group))
+    return temp
+
+
+def name_conditions(name, regex=False):
+    """
+    :param name: what the user typed, "kaom hea"
+    :param regex: the name is a regular expression, matched case-insensitively against every stored name
+    :return: the conditions for "$and", by default every word is an anchored prefix of one word of the name,
+             each of them a range of the name_tokens index
+    """
+    if regex:
+        return [{"name_lower": {"$regex": name, "$options": "i"}}]
+    name = name.strip().lower()
+    words = NAME_WORD.findall(name)
+    if len(words) == 0:
+        # only punctuation, the start of the whole name
+        return [{"name_lower": {"$regex": "^" + re.escape(name)}}]
+    # the longest word first, it is the narrowest range for the planner to pick
+    words.sort(key=len, reverse=True)
+    return [{"name_tokens": {"$regex": "^" + re.escape(n)}} for n in words]
+
+
+def value_range(lower, upper):
+    # a bound of 0 is a bound, only the empty fields are left out
+    temp = {}
+    if lower is not None:
+        temp["$gte"] = lower
+    if upper is not None:
+        temp["$lte"] = upper
+    return temp or None
+
+
+def mod_entries(form, mod_ids=None):
+    """
+    the single mods_name field and every entry of Mods_content
+    :return: [{"keys", "match", "range", "group", "weight"}], match is the $elemMatch of the mod
+    """
+    temp = []
+    fields = [(form.mods_name.data, form.mods_lower_bound.data, form.mods_upper_bound.data, "and", 1)]
+    for n in form.Mods_content.entries:
+        fields.append((n.mods_name.data, n.mods_lower_bound.data, n.mods_upper_bound.data,
+                       n.mods_group.data or "and", 1 if n.mods_weight.data is None else n.mods_weight.data))
+    for name, lower, upper, group, weight in fields:
+        if not name:
+            continue
+        # the crawler stores the template, or its id from mod_templates, as k
+        keys = [name, mod_ids[name]] if mod_ids and name in mod_ids else [name]
+        match = {"k": {"$in": keys}} if len(keys) > 1 else {"k": name}
+        mods_range = value_range(lower, upper)
+        if mods_range:
+            match["v"] = mods_range
+        temp.append({"keys": keys, "match": match, "range": mods_range, "group": group, "weight": weight})
+    return temp
+
+
+def mod_expression(entry):
+    # true for the element $$m of the mods array that is this mod in its range
+    conditions = [{"$in": ["$$m.k", entry["keys"]]}]
+    for operator, bound in (entry["range"] or {}).items():
+        conditions.append({operator: ["$$m.v", bound]})
+    return {"$and": conditions}
+
+
+def mod_stages(form, mod_ids=None):
+    """
+    the aggregation stages after the $match of parser for the "count" and "weight" mod groups
+    - mods_matched: how many of the "count" mods the item has, at least mods_count (1 by default)
+    - mods_weight: the sum of value * weight over the "weight" mods, at least mods_min_weight if given
+    :return: [] when the form has no such group
+    """
+    entries = mod_entries(form, mod_ids)
+    mods = {"$ifNull": ["$mods", []]}
+    fields = {}
+    match = {}
+    counted = [n for n in entries if n["group"] == "count"]
+    if counted:
+        fields["mods_matched"] = {"$add": [{"$cond": [{"$anyElementTrue": [{"$map": {
+            "input": mods, "as": "m", "in": mod_expression(n)}}]}, 1, 0]} for n in counted]}
+        match["mods_matched"] = {"$gte": 1 if form.mods_count.data is None else form.mods_count.data}
+    weighted = [n for n in entries if n["group"] == "weight"]
+    if weighted:
+        fields["mods_weight"] = {"$sum": {"$map": {"input": mods, "as": "m", "in": {"$switch": {
+            "branches": [{"case": mod_expression(n), "then": {"$multiply": ["$$m.v", n["weight"]]}}
+                         for n in weighted], "default": 0}}}}}
+        if form.mods_min_weight.data is not None:
+            match["mods_weight"] = {"$gte": form.mods_min_weight.data}
+    if not fields:
+        return []
+    stages = [{"$addFields": fields}]
+    if match:
+        stages.append({"$match": match})
+    return stages
+
+
+def parser(form, mod_ids=None):
+    """
+    :param form: the ItemQueryForm
+    :param mod_ids: {mod template: id} from the mod_templates collection, used for the items
+                    that store the id of the template in mods.k
+    :return: the list of conditions for "$and"
+    """
+    # the crawler can mark sold or delisted items as inactive instead of deleting them
+    query_and = [{"active": {"$ne": False}}]
+    # the names the crawler stores in Price.Currency
+    price_name = {"Blessed Orb": "blessed",
+                  "Cartographer's Chisel": "chisel", "Chaos Orb": "chaos", "Chromatic Orb": "chrom",
+                  "Divine Orb": "divine", "Exalted Orb": "exa", "Gemcutter's Prism": "gcp", "Jeweller's Orb": "jew",
                   "Orb of Alchemy": "alch", "Orb of Alteration": "alt", "Orb of Chance": "chance",
-                  "Orb of Fusing": "fus", "Orb of Regret": "regret", "Orb of Scouring": "scour", "Regal Orb": "regal",
+                  "Orb of Fusing": "fuse", "Orb of Regret": "regret", "Orb of Scouring": "scour", "Regal Orb": "regal",
                   "Vaal Orb": "vaal", "Perandus Coin": "perandus", "Silver Coin": "silver"}
 
-    if form.currency_name.data:
+    if form.currency_name.data and form.currency_name.data in price_name:
         if form.min_price.data:
             if form.max_price.data:
                 query_and.append({"Price.Currency": price_name[form.currency_name.data],
@@ -21,15 +159,25 @@ def parser(form):
                                   "Price.Number": {"$lte": form.max_price.data}})
             else:
                 query_and.append({"Price.Currency": price_name[form.currency_name.data]})
+    else:
+        # without a currency the price range is in chaos orbs, over every currency
+        if form.min_price.data:
+            if form.max_price.data:
+                query_and.append({"chaos_value": {"$gte": form.min_price.data, "$lte": form.max_price.data}})
+            else:
+                query_and.append({"chaos_value": {"$gte": form.min_price.data}})
+        elif form.max_price.data:
+            query_and.append({"chaos_value": {"$lte": form.max_price.data}})
 
     if form.name.data:
-        query_and.append({"name": {"$regex":form.name.data, "$options":"gi"}})
+        query_and.extend(name_conditions(form.name.data, form.name_regex.data))
 
     if form.type.data:
-        if form.type.data == 'Flask' or form.type.data[-1] == 's':
-            query_and.append({"type": form.type.data})
+        # the crawler stores every category with its ancestors in "categories", one index for every level
+        if form.type.data in TYPE_CATEGORIES:
+            query_and.append({"categories": TYPE_CATEGORIES[form.type.data]})
         else:
-            query_and.append({"type": form.type.data.replace(" ","") + "s"})
+            query_and.append({"categories": form.type.data})
 
     if form.typeLine.data:
         query_and.append({"typeLine": form.typeLine.data})
@@ -59,15 +207,23 @@ def parser(form):
         else:
             query_and.append({"sockets.socket_number": {"$gte": form.min_socket_number.data}})
 
+    # the crawler stores the biggest linked group as sockets.max_link
     if form.min_link_number.data:
         if form.max_link_number.data:
-            query_and.append(
-                {"sockets.link": {"$in": [i for i in range(form.min_link_number.data, form.min_link_number.data + 1)]}})
+            query_and.append({"sockets.max_link": {"$gte": form.min_link_number.data,
+                                                   "$lte": form.max_link_number.data}})
         else:
-            query_and.append({"sockets.link": {"$in": [i for i in range(form.min_link_number.data, 7)]}})
+            query_and.append({"sockets.max_link": {"$gte": form.min_link_number.data}})
     else:
         if form.max_link_number.data:
-            query_and.append({"sockets.link": {"$in": [i for i in range(0, form.max_link_number.data)]}})
+            query_and.append({"sockets.max_link": {"$lte": form.max_link_number.data}})
+
+    # colours in one linked group, "6L with 3 red linked" is an $in over the groups it can be
+    linked = {"R": form.linked_str_socket.data or 0, "G": form.linked_dex_socket.data or 0,
+              "B": form.linked_int_socket.data or 0, "W": form.linked_other_socket.data or 0}
+    if any(linked.values()):
+        query_and.append({"sockets.groups": {"$in": linked_groups(linked, form.min_link_number.data or 1,
+                                                                  form.max_link_number.data or 6)}})
 
     if form.str_socket.data:
         query_and.append({"sockets.S": {"$gte": form.str_socket.data}})
@@ -134,106 +290,27 @@ def parser(form):
             query_and.append(
                 {"requirements.Level": {"$lte": form.max_requirements_lvl.data}})
 
-    # properties
-    if form.min_physical_damage.data:
-        if form.max_physical_damage.data:
-            damage = float(form.min_physical_damage.data) + float(form.max_physical_damage.data)
-            query_and.append(
-                {"properties.Physical Damage": {"$gte": damage / 2}})
-        else:
-            damage = float(form.min_physical_damage.data)
-            query_and.append(
-                {"properties.Physical Damage": {"$gte": damage}})
-    else:
-        if form.max_physical_damage.data:
-            damage = float(form.max_physical_damage.data)
-            query_and.append(
-                {"properties.Physical Damage": {"$lte": damage}})
-
-    if form.min_elemental_damage.data:
-        if form.max_elemental_damage.data:
-            edamage = float(form.min_elemental_damage.data) + float(form.max_elemental_damage.data)
-            query_and.append(
-                {"properties.Elemental Damage": {"$gte": edamage / 2}})
-        else:
-            edamage = float(form.min_elemental_damage.data)
-            query_and.append(
-                {"properties.Elemental Damage": {"$gte": edamage}})
-    else:
-        if form.max_elemental_damage.data:
-            edamage = float(form.max_elemental_damage.data)
-            query_and.append(
-                {"properties.Elemental Damage": {"$lte": edamage}})
-
-    if form.min_critical_strike_chance.data:
-        if form.max_critical_strike_chance.data:
-            crit = float(form.min_critical_strike_chance.data) + float(form.max_critical_strike_chance.data)
-            query_and.append(
-                {"properties.Critical Strike Chance": {"$gte": crit / 2}})
-        else:
-            crit = float(form.min_critical_strike_chance.data)
-            query_and.append(
-                {"properties.Critical Strike Chance": {"$gte": crit}})
-    else:
-        if form.max_critical_strike_chance.data:
-            crit = float(form.max_critical_strike_chance.data)
-            query_and.append(
-                {"properties.Critical Strike Chance": {"$lte": crit}})
-
-    if form.min_attacks_per_second.data:
-        if form.max_attacks_per_second.data:
-            aps = float(form.min_attacks_per_second.data) + float(form.max_attacks_per_second.data)
-            query_and.append(
-                {"properties.Attacks per Second": {"$gte": aps / 2}})
-        else:
-            aps = float(form.min_attacks_per_second.data)
-            query_and.append(
-                {"properties.Attacks per Second": {"$gte": aps}})
-    else:
-        if form.max_attacks_per_second.data:
-            aps = float(form.max_critical_strike_chance.data)
-            query_and.append(
-                {"properties.Attacks per Second": {"$lte": aps}})
-
-    if form.min_armour.data:
-        if form.max_armour.data:
-            query_and.append(
-                {"properties.Armour": {"$gte": form.min_armour.data,
-                                       "$lte": form.max_armour.data}})
-        else:
-            query_and.append(
-                {"properties.Armour": {"$gte": form.min_armour.data}})
-    else:
-        if form.max_armour.data:
-            query_and.append(
-                {"properties.Armour": {"$lte": form.max_armour.data}})
-
-    if form.min_evasion.data:
-        if form.max_evasion.data:
-            query_and.append(
-                {"properties.Evasion Rating": {"$gte": form.min_evasion.data,
-                                               "$lte": form.max_evasion.data}})
-        else:
-            query_and.append(
-                {"properties.Evasion Rating": {"$gte": form.min_evasion.data}})
-    else:
-        if form.max_evasion.data:
-            query_and.append(
-                {"properties.Evasion Rating": {"$lte": form.max_evasion.data}})
-
-    if form.min_shield.data:
-        if form.max_shield.data:
-            query_and.append(
-                {"properties.Energy Shield": {"$gte": form.min_shield.data,
-                                              "$lte": form.max_shield.data}})
-        else:
-            query_and.append(
-                {"properties.Energy Shield": {"$gte": form.min_shield.data}})
-    else:
-        if form.max_shield.data:
-            query_and.append(
-                {"properties.Energy Shield": {"$lte": form.max_shield.data}})
-
+    # properties, the damage is stored as the average of its range
+    range_fields = [("properties.Physical Damage", form.min_physical_damage, form.max_physical_damage),
+                    ("properties.Elemental Damage", form.min_elemental_damage, form.max_elemental_damage),
+                    ("properties.Critical Strike Chance", form.min_critical_strike_chance,
+                     form.max_critical_strike_chance),
+                    ("properties.Attacks per Second", form.min_attacks_per_second, form.max_attacks_per_second),
+                    # dps and defences are computed by the crawler at 20% quality
+                    ("pdps", form.min_pdps, form.max_pdps),
+                    ("edps", form.min_edps, form.max_edps),
+                    ("dps", form.min_dps, form.max_dps),
+                    ("armour", form.min_armour, form.max_armour),
+                    ("evasion", form.min_evasion, form.max_evasion),
+                    ("energy_shield", form.min_shield, form.max_shield)]
+    for key, low, high in range_fields:
+        if low.data:
+            if high.data:
+                query_and.append({key: {"$gte": float(low.data), "$lte": float(high.data)}})
+            else:
+                query_and.append({key: {"$gte": float(low.data)}})
+        elif high.data:
+            query_and.append({key: {"$lte": float(high.data)}})
 
     if form.min_quality.data:
         if form.max_quality.data:
@@ -250,22 +327,16 @@ def parser(form):
 
 
 
-    if form.mods_name.data:
-        if form.mods_lower_bound.data:
-            if form.mods_upper_bound.data:
-                query_and.append(
-                    {"Mods."+form.mods_name.data: {"$gte": form.mods_lower_bound.data,
-                                            "$lte": form.mods_upper_bound.data}})
-            else:
-                query_and.append(
-                    {"Mods."+form.mods_name.data: {"$gte": form.mods_lower_bound.data}})
-
-        elif form.mods_upper_bound.data:
-            query_and.append(
-                {"Mods." + form.mods_name.data: {"$lte": form.mods_upper_bound.data}})
-        else:
-            query_and.append(
-                {"Mods." + form.mods_name.data: {"$exists": True}})
-
+    # mods, every group is one or more $elemMatch on the mods.k, mods.v index
+    entries = mod_entries(form, mod_ids)
+    for n in [n for n in entries if n["group"] == "and"]:
+        query_and.append({"mods": {"$elemMatch": n["match"]}})
+    # an item needs one of its "count" mods to reach the count, and one "weight" mod to reach a positive sum
+    counted = [n for n in entries if n["group"] == "count"]
+    if counted:
+        query_and.append({"$or": [{"mods": {"$elemMatch": n["match"]}} for n in counted]})
+    weighted = [n for n in entries if n["group"] == "weight"]
+    if weighted and (form.mods_min_weight.data or 0) > 0 and all(n["weight"] > 0 for n in weighted):
+        query_and.append({"$or": [{"mods": {"$elemMatch": n["match"]}} for n in weighted]})
 
     return query_and
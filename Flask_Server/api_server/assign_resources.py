@@ -9,6 +9,7 @@ from .api_resources.UserCurrencyPostManagement import UserCurrencyPostManagement
 from .api_resources.UserCurrencyPostSearch import UserCurrencyPostSearch
 from .api_resources.ItemSearch import ItemSearch
 from .api_resources.UserInfoUpdate import UserInfoUpdate
+from .api_resources.MongoStats import MongoStats
 
 api.add_resource(UserLogin, "/api/authenticate")
 api.add_resource(UserRegister, "/api/reg")
@@ -19,3 +20,4 @@ api.add_resource(Admin, "/api/admin/<username>", "/api/admin")
 api.add_resource(GetToken, "/api/token")
 api.add_resource(UserCurrencyPostSearch, "/api/currency/<currency_name>", "/api/currency")
 api.add_resource(ItemSearch, "/api/item")
+api.add_resource(MongoStats, "/api/mongo/stats")
@@ -1,7 +1,7 @@
 from flask import g
 from flask_wtf import FlaskForm
 from wtforms import StringField, BooleanField, PasswordField, IntegerField, FloatField, FieldList, FormField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional
+from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional, AnyOf
 from .database import User
 
 
@@ -67,13 +67,17 @@ class CurrencySearchForm(FlaskForm):
 
 
 class Mods(FlaskForm):
-    mods_name = StringField('Mods Name', validators=[Length(1, 64)])
-    mods_upper_bound = FloatField('Min', validators=[NumberRange(0, 1500)])
-    mods_lower_bound = FloatField('Max', validators=[NumberRange(0, 1500)])
+    mods_name = StringField('Mods Name', validators=[Length(1, 256)])
+    mods_upper_bound = FloatField('Max', validators=[NumberRange(0, 1500), Optional()], default=None)
+    mods_lower_bound = FloatField('Min', validators=[NumberRange(0, 1500), Optional()], default=None)
+    # "and": the item must have it, "count": at least mods_count of the group, "weight": in the weighted sum
+    mods_group = StringField('Mods Group', validators=[AnyOf(['and', 'count', 'weight']), Optional()], default='and')
+    mods_weight = FloatField('Mods Weight', validators=[Optional()], default=1)
 
 
 class ItemQueryForm(FlaskForm):
     name = StringField('Item Name', validators=[Length(1, 64), Optional()], default=None)
+    name_regex = BooleanField('Item Name Is A Regex', validators=[Optional()], default=False)
     type = StringField('Item Type', validators=[Length(1, 64), Optional()], default=None)
     typeLine = StringField('Item Type Line', validators=[Length(1, 64), Optional()], default=None)
     league = StringField('League', validators=[Length(1, 64)], default=None)
@@ -101,6 +105,13 @@ class ItemQueryForm(FlaskForm):
     other_socket = IntegerField('White Sockets Number', validators=[NumberRange(0, 6), Optional()],
                                     default=None)
 
+    # sockets of each colour in the same linked group
+    linked_str_socket = IntegerField('Linked STR Sockets', validators=[NumberRange(0, 6), Optional()], default=None)
+    linked_dex_socket = IntegerField('Linked DEX Sockets', validators=[NumberRange(0, 6), Optional()], default=None)
+    linked_int_socket = IntegerField('Linked INT Sockets', validators=[NumberRange(0, 6), Optional()], default=None)
+    linked_other_socket = IntegerField('Linked White Sockets', validators=[NumberRange(0, 6), Optional()],
+                                       default=None)
+
     supported = BooleanField('Support Skill Gem', validators=[Optional()], default=None)
 
     # inside the requirement of the document in mongodb
@@ -136,7 +147,15 @@ class ItemQueryForm(FlaskForm):
     max_attacks_per_second = FloatField('Attacks per Second', validators=[NumberRange(0, 1000), Optional()],
                                         default=None)
 
-    # for armour
+    # computed by the crawler at 20% quality
+    min_pdps = FloatField('Min Physical DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+    max_pdps = FloatField('Max Physical DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+    min_edps = FloatField('Min Elemental DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+    max_edps = FloatField('Max Elemental DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+    min_dps = FloatField('Min Total DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+    max_dps = FloatField('Max Total DPS', validators=[NumberRange(0, 5000), Optional()], default=None)
+
+    # for armour, the totals at 20% quality
     min_armour = FloatField('Min Armour', validators=[NumberRange(0, 1500), Optional()], default=None)
     max_armour = FloatField('Max Armour', validators=[NumberRange(0, 1500), Optional()], default=None)
     min_evasion = FloatField('Min Evasion', validators=[NumberRange(0, 1500), Optional()], default=None)
@@ -147,8 +166,13 @@ class ItemQueryForm(FlaskForm):
     min_quality = FloatField('Min Quality', validators=[NumberRange(0, 100), Optional()], default=None)
     max_quality = FloatField('Max Quality', validators=[NumberRange(0, 100), Optional()], default=None)
 
+    # highest first on one of pdps, edps, dps, armour, evasion, energy_shield instead of cheapest first
+    sort_by = StringField('Sort By', validators=[Length(1, 64), Optional()], default=None)
+
     # there is a lot of them
     Mods_content = FieldList(FormField(Mods), min_entries=0)
-    mods_name = StringField('Mods Name', validators=[Length(1, 64), Optional()], default=None)
-    mods_upper_bound = FloatField('Min', validators=[NumberRange(0, 1500), Optional()], default=None)
-    mods_lower_bound = FloatField('Max', validators=[NumberRange(0, 1500), Optional()], default=None)
+    mods_name = StringField('Mods Name', validators=[Length(1, 256), Optional()], default=None)
+    mods_upper_bound = FloatField('Max', validators=[NumberRange(0, 1500), Optional()], default=None)
+    mods_lower_bound = FloatField('Min', validators=[NumberRange(0, 1500), Optional()], default=None)
+    mods_count = IntegerField('Least Number of Mods', validators=[NumberRange(1, 50), Optional()], default=None)
+    mods_min_weight = FloatField('Least Weighted Sum', validators=[Optional()], default=None)
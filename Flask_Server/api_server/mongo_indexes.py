@@ -0,0 +1,131 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import time
+
+# the numbers the search filters on that only some items have, each one is a partial index over the items having it
+PARTIAL_FIELDS = ['requirements.Level', 'requirements.Str', 'requirements.Dex', 'requirements.Int',
+                  'properties.Quality', 'properties.Physical Damage', 'properties.Elemental Damage',
+                  'properties.Critical Strike Chance', 'properties.Attacks per Second']
+
+
+def partial_name(field):
+    return field.replace('.', '_').replace(' ', '_').lower()
+
+
+# name -> (keys, options), every index of the item search: the shapes mongoSearchFormParser.parser builds and the
+# sorts of ItemSearch.post. The crawler only makes the indexes its own writes need (the unique id of the upsert mode,
+# stash_id + id of the stash tracker), python manage.py indexes builds these.
+INDEXES = dict([
+    # "cheapest first" over every currency is one scan of the chaos_value index
+    ('chaos_value', ([('chaos_value', ASCENDING)], {})),
+    ('league_chaos', ([('league', ASCENDING), ('chaos_value', ASCENDING)], {})),
+    # any level of the category tree, cheapest first
+    ('categories_chaos', ([('categories', ASCENDING), ('chaos_value', ASCENDING)], {})),
+    ('league_categories_chaos', ([('league', ASCENDING), ('categories', ASCENDING), ('chaos_value', ASCENDING)], {})),
+    ('league_categories_currency_price', ([('league', ASCENDING), ('categories', ASCENDING),
+                                           ('Price.Currency', ASCENDING), ('Price.Number', ASCENDING)], {})),
+    ('currency_price', ([('Price.Currency', ASCENDING), ('Price.Number', ASCENDING)], {})),
+    # {mods: {$elemMatch: {k: ..., v: range}}} is bounded on both keys
+    ('mods', ([('mods.k', ASCENDING), ('mods.v', ASCENDING)], {})),
+    # anchored prefixes of the lower case name and of its words
+    ('league_name_lower', ([('league', ASCENDING), ('name_lower', ASCENDING)], {})),
+    ('name_tokens', ([('name_tokens', ASCENDING)], {})),
+    # link and linked colour searches, groups is multikey
+    ('sockets_max_link', ([('sockets.max_link', ASCENDING)], {})),
+    ('sockets_groups', ([('sockets.groups', ASCENDING)], {})),
+    ('ilvl_chaos', ([('ilvl', ASCENDING), ('chaos_value', ASCENDING)], {}))] +
+    # only weapons have dps and only armours have defences, the other items stay out of these indexes
+    [(field, ([(field, ASCENDING)], {'sparse': True}))
+     for field in ['pdps', 'edps', 'dps', 'armour', 'evasion', 'energy_shield']] +
+    [(partial_name(field), ([(field, ASCENDING)], {'partialFilterExpression': {field: {'$exists': True}}}))
+     for field in PARTIAL_FIELDS])
+
+
+def same_index(info, keys, options):
+    # the same keys and options, whatever the name
+    return [tuple(n) for n in info['key']] == keys and \
+        info.get('partialFilterExpression') == options.get('partialFilterExpression') and \
+        bool(info.get('sparse')) == bool(options.get('sparse'))
+
+
+def index_models():
+    return [IndexModel(keys, name=name, background=True, **options) for name, (keys, options) in INDEXES.items()]
+
+
+def check_indexes(collection):
+    """
+    :return: {'missing': [names], 'different': [names], 'ok': [names]}
+             different means an index with the same name but other keys or options,
+             an index with the same keys and options under another name is ok, it serves the same queries
+    """
+    existing = collection.index_information()
+    temp = {'missing': [], 'different': [], 'ok': []}
+    for name, (keys, options) in INDEXES.items():
+        if name in existing:
+            temp['ok' if same_index(existing[name], keys, options) else 'different'].append(name)
+        elif any(same_index(info, keys, options) for info in existing.values()):
+            temp['ok'].append(name)
+        else:
+            temp['missing'].append(name)
+    return temp
+
+
+def ensure_indexes(collection):
+    """
+    build the missing indexes in the background, the search keeps working while they are built
+    an index with the same name but another definition is left alone and reported
+    every index is its own command, one that fails does not stop the others
+    :return: the result of check_indexes before the build
+    """
+    state = check_indexes(collection)
+    for model in index_models():
+        if model.document['name'] in state['missing']:
+            try:
+                collection.create_indexes([model])
+            except OperationFailure as e:
+                print("Could not build the index %s: %s" % (model.document['name'], e))
+    for name in state['different']:
+        print("Index %s differs from its definition, drop it to rebuild it" % name)
+    return state
+
+
+def index_sizes(db, collection_name='posts'):
+    # collStats reads the sizes from the metadata, in bytes
+    stats = db.command('collStats', collection_name)
+    return {'count': stats.get('count', 0), 'size': stats.get('size', 0),
+            'total_index_size': stats.get('totalIndexSize', 0), 'index_sizes': stats.get('indexSizes', {})}
+
+
+def build_progress(db):
+    # the index builds running now, from currentOp
+    temp = []
+    for op in db.current_op().get('inprog', []):
+        if 'Index Build' in op.get('msg', ''):
+            progress = op.get('progress', {})
+            temp.append({'namespace': op.get('ns'), 'message': op.get('msg'),
+                         'done': progress.get('done'), 'total': progress.get('total'),
+                         'seconds_running': op.get('secs_running')})
+    return temp
+
+
+def report(db, collection_name='posts', wait=False, interval=5):
+    """
+    print the state of every index, their sizes and the builds in progress
+    :param wait: repeat the build progress every interval seconds until no build is left
+    """
+    state = check_indexes(db[collection_name])
+    for key in ['ok', 'missing', 'different']:
+        for name in state[key]:
+            print("%-40s %s" % (name, key))
+    sizes = index_sizes(db, collection_name)
+    print("%i documents, %.1f MB of data, %.1f MB of indexes" % (sizes['count'], sizes['size'] / 1e6,
+                                                               sizes['total_index_size'] / 1e6))
+    for name, size in sorted(sizes['index_sizes'].items()):
+        print("%-40s %10.1f MB" % (name, size / 1e6))
+    while True:
+        builds = build_progress(db)
+        for n in builds:
+            print("%s %s: %s / %s" % (n['namespace'], n['message'], n['done'], n['total']))
+        if not wait or len(builds) == 0:
+            return state
+        time.sleep(interval)
@@ -0,0 +1,64 @@
+from pymongo import monitoring
+from collections import deque
+import threading
+
+
+class pool_listener(monitoring.CommandListener):
+    """
+    pymongo 3.4 has no connection pool events, but a command holds one pooled connection from started
+    to succeeded / failed, so the commands in flight are the connections in use
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.max_in_use = 0
+        self.commands = 0
+        # not "failed", that is the listener method pymongo calls
+        self.failures = 0
+        self.total_micros = 0
+        # the durations of the last window commands, for the percentiles
+        self.durations = deque(maxlen=window)
+
+    def started(self, event):
+        with self.lock:
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def finished(self, event):
+        with self.lock:
+            self.in_use -= 1
+            self.commands += 1
+            self.total_micros += event.duration_micros
+            self.durations.append(event.duration_micros)
+
+    def succeeded(self, event):
+        self.finished(event)
+
+    def failed(self, event):
+        self.finished(event)
+        with self.lock:
+            self.failures += 1
+
+    def stats(self, pool_size=None):
+        with self.lock:
+            durations = sorted(self.durations)
+            temp = {'in_use': self.in_use, 'max_in_use': self.max_in_use, 'pool_size': pool_size,
+                    'commands': self.commands, 'failed': self.failures,
+                    'avg_ms': self.total_micros / self.commands / 1000.0 if self.commands else 0.0}
+        for name, q in [('p50_ms', 0.5), ('p99_ms', 0.99)]:
+            temp[name] = durations[int(q * (len(durations) - 1))] / 1000.0 if durations else 0.0
+        return temp
+
+
+listener = pool_listener()
+# registered before any client is made, every MongoClient of the process reports to it
+monitoring.register(listener)
+
+
+def mongo_host(config):
+    # the pool options go in the uri, flask_pymongo 0.4.1 passes the pool size with its pymongo 2 name
+    options = 'maxPoolSize=%i&waitQueueTimeoutMS=%i&serverSelectionTimeoutMS=%i' % (
+        config['MONGO_POOL_SIZE'], config['MONGO_WAIT_QUEUE_TIMEOUT_MS'], config['MONGO_SERVER_SELECTION_TIMEOUT_MS'])
+    host = config['MONGO_HOST']
+    return host + ('&' if '?' in host else '?') + options
@@ -12,13 +12,15 @@
         vm.hidden = true;
         //vm.tempdatas = vm.list1;
         vm.list1 = ["Legacy", "Hardcore Legacy", "Standard", "Hardcore"];
-        vm.list2 = ["any", "Bow", "Claw", "Dagger", "One Hand Axe", "One Hand Mace", "One Hand Sword"
+        vm.list2 = ["any", "Weapons", "One Hand", "Two Hand", "Armour", "Accessories", "Bow", "Claw", "Dagger", "One Hand Axe", "One Hand Mace", "One Hand Sword"
             , "Sceptre", "Staff", "Two Hand Axe", "Two Hand Mace", "Two Hand Sword", "Wand", "Body Armour", "Boots", "Gloves", "Helmet", "Shield", "Amulet", "Belt"
             , "Breach", "Currency", "Divination Card", "Essence", "Fishing Rods", "Flask", "Gem", "Jewel", "Leaguestone", "Map", "Prophecy", "Quiver", "Ring", "Map Fragments"];
         vm.list4 = ["Select", "Blessed Orb", "Cartographer's Chisel", "Chaos Orb", "Chromatic Orb", "Divine Orb", "Exalted Orb", "Gemcutter's Prism", "Jeweller's Orb",
             "Orb of Alchemy", "Orb of Alteration", "Orb of Chance", "Orb of Fusing", "Orb of Regret", "Orb of Scouring", "Regal Orb", "Vaal Orb", "Perandus Coin", "Silver Coin"];
         vm.list5 = ["any", "Normal", "Magic", "Rare", "Unique", "Relic"];
         vm.list6 = ["either", "Yes", "No"];
+        vm.modGroups = [{value: "and", name: "Must have"}, {value: "count", name: "Count"},
+            {value: "weight", name: "Weighted"}];
         vm.list7 = ["either", "Yes", "No"];
         vm.list8 = ['Select', '+X Accuracy Rating per X Intelligence', '+X Armour per active Totem', '+X Armour while stationary', '+X Energy Shield gained for each Enemy hit by your Attacks', '+X Energy Shield gained on Kill', '+X Energy Shield gained on Kill per Level', '+X Energy Shield gained on Killing a Shocked Enemy', '+X Intelligence Requirement', '+X Life and Mana gained for each Enemy hit', '+X Life gained for each Enemy hit by Attacks', '+X Life gained for each Enemy hit by your Attacks', '+X Life gained for each Enemy hit by your Spells', '+X Life gained for each Ignited Enemy hit by your Attacks', '+X Life gained for each enemy hit by Supported Attack', '+X Life gained on Kill', '+X Life gained on Kill per Frenzy Charge', '+X Life gained on Kill per Level', '+X Life gained on Killing Ignited Enemies', '+X Life gained when you Block', '+X Life per X Dexterity', '+X Mana gained for each Enemy hit by Attacks', '+X Mana gained for each Enemy hit by your Attacks', '+X Mana gained on Kill', '+X Mana gained on Kill per Level', '+X Mana gained on Killing a Frozen Enemy', '+X Mana gained when you Block', '+X Mana per X Strength', '+X Strength Requirement', '+X maximum Energy Shield per X Strength', '+X to Accuracy Rating', '+X to Armour', '+X to Armour and Evasion Rating', '+X to Armour while Frozen', '+X to Dexterity', '+X to Dexterity and Intelligence', '+X to Evasion Rating', '+X to Explosion Radius per Fuse Charge', '+X to Intelligence', '+X to Level of Active Socketed Skill Gems', '+X to Level of Socketed Aura Gems', '+X to Level of Socketed Bow Gems', '+X to Level of Socketed Chaos Gems', '+X to Level of Socketed Cold Gems', '+X to Level of Socketed Curse Gems', '+X to Level of Socketed Dexterity Gems', '+X to Level of Socketed Elemental Gems', '+X to Level of Socketed Fire Gems', '+X to Level of Socketed Gems', '+X to Level of Socketed Golem Gems', '+X to Level of Socketed Lightning Gems', '+X to Level of Socketed Melee Gems', '+X to Level of Socketed Minion Gems', '+X to Level of Socketed Movement Gems', '+X to Level of Socketed Spell Gems', '+X to Level of Socketed Strength Gems', '+X to Level of Socketed Support Gems', '+X to Level of Socketed Vaal Gems', '+X to Level of Socketed Warcry Gems', '+X to Level of Supported Active Skill Gems', '+X to Maximum Charges', '+X to Maximum Endurance Charges', '+X to Maximum Energy Shield per Blue Socket', '+X to Maximum Frenzy Charges', '+X to Maximum Life per Red Socket', '+X to Maximum Mana per Green Socket', '+X to Maximum Power Charges', '+X to Melee Weapon Range', '+X to Melee Weapon Range per White Socket', '+X to Melee Weapon and Unarmed range', '+X to Strength', '+X to Strength and Dexterity', '+X to Strength and Intelligence', '+X to Weapon range', '+X to Zombie maximum Life', '+X to all Attributes', '+X to maximum Energy Shield', '+X to maximum Life', '+X to maximum Mana', '+X to maximum number of Skeletons', '+X to maximum number of Spectres', '+X to maximum number of Zombies', '+X to radius', '+X% Chance to Block', '+X% Chance to Block with Shields', '+X% Chaos Resistance when on Low Life', '+X% Monster Chaos Resistance', '+X% Monster Cold Resistance', '+X% Monster Elemental Resistance', '+X% Monster Fire Resistance', '+X% Monster Lightning Resistance', '+X% Monster Physical Damage Reduction', '+X% Unarmed Critical Strike Chance', '+X% additional Block Chance against Projectiles', '+X% chance to be Ignited', '+X% chance to be Pierced by Projectiles', '+X% chance to be Shocked', '+X% to Chaos Resistance', '+X% to Chaos Resistance while using a Flask', '+X% to Cold Resistance', '+X% to Cold Resistance when Socketed with a Green Gem', '+X% to Cold and Lightning Resistances', '+X% to Critical Strike Chance', '+X% to Critical Strike Multiplier for Spells', '+X% to Critical Strike Multiplier', '+X% to Critical Strike Multiplier while Dual Wielding', '+X% to Critical Strike Multiplier with Cold Skills', '+X% to Critical Strike Multiplier with Elemental Skills', '+X% to Critical Strike Multiplier with Fire Skills', '+X% to Critical Strike Multiplier with Lightning Skills', '+X% to Critical Strike Multiplier with One Handed Melee Weapons', '+X% to Critical Strike Multiplier with Two Handed Melee Weapons', '+X% to Fire Resistance', '+X% to Fire Resistance when Socketed with a Red Gem', '+X% to Fire Resistance while on Low Life', '+X% to Fire and Cold Resistances', '+X% to Fire and Lightning Resistances', '+X% to Global Critical Strike Multiplier', '+X% to Global Critical Strike Multiplier per Green Socket', '+X% to Lightning Resistance', '+X% to Lightning Resistance when Socketed with a Blue Gem', '+X% to Melee Critical Strike Multiplier', '+X% to Monster Critical Strike Multiplier', '+X% to Quality of Socketed Support Gems', '+X% to Quality of Supported Active Skill Gems', '+X% to all Elemental Resistances', '+X% to all Elemental Resistances while on Low Life', '+X% to all maximum Elemental Resistances during Flask effect', '+X% to all maximum Resistances', '+X% to maximum Block Chance', '+X% to maximum Cold Resistance', '+X% to maximum Fire Resistance', '+X% to maximum Lightning Resistance', '-X Chaos Damage taken', '-X Fire Damage taken when Hit', '-X Physical Damage taken from Attacks', '-X Physical Damage taken from Projectile Attacks', '-X Physical Damage taken when Hit by Animals', '-X to Accuracy Rating', '-X to Mana Cost of Skills', '-X to Maximum Endurance Charges', '-X to Maximum Frenzy Charges', '-X to Maximum Power Charges', '-X% Chance to Block', '-X% maximum Player Resistances', '-X% to Cold Resistance', '-X% to Fire Resistance', '-X% to Global Critical Strike Multiplier', '-X% to Lightning Resistance', '-X% to all Elemental', 'A stack of unknown divination cards', 'Acrobatics', 'Additional Debuff stages add X% of Damage', 'Additional X seconds Base Duration per extra Corpse consumed', 'Additional X% Shield Block Chance', 'Adds Knockback during Flask effect', 'Adds Knockback to Melee Attacks during Flask effect', 'Adds X maximum Lightning Damage to Attacks per X Dexterity Allocated in Radius', 'Adds X to Maximum Life per X Intelligence Allocated in Radius', 'Adds X to X Chaos Damage', 'Adds X to X Chaos Damage in Off Hand', 'Adds X to X Chaos Damage to Attacks', 'Adds X to X Chaos Damage to Spells', 'Adds X to X Cold Damage', 'Adds X to X Cold Damage in Off Hand', 'Adds X to X Cold Damage to Attacks', 'Adds X to X Cold Damage to Counterattacks', 'Adds X to X Cold Damage to Spells', 'Adds X to X Cold Damage to Spells and Attacks', 'Adds X to X Cold Damage to Spells per Power Charge', 'Adds X to X Fire Attack Damage per Buff on You', 'Adds X to X Fire Damage', 'Adds X to X Fire Damage in Main Hand', 'Adds X to X Fire Damage to Attacks', 'Adds X to X Fire Damage to Attacks against Ignited Enemies', 'Adds X to X Fire Damage to Attacks with Bows', 'Adds X to X Fire Damage to Spells', 'Adds X to X Fire Spell Damage per Buff on You', 'Adds X to X Lightning Damage', 'Adds X to X Lightning Damage to Attacks', 'Adds X to X Lightning Damage to Attacks during Flask effect', 'Adds X to X Lightning Damage to Attacks while Unarmed', 'Adds X to X Lightning Damage to Spells', 'Adds X to X Lightning Damage to Spells and Attacks', 'Adds X to X Lightning Damage to Spells during Flask effect', 'Adds X to X Lightning Damage to Spells while Unarmed', 'Adds X to X Physical Damage', 'Adds X to X Physical Damage to Attacks', 'Adds X to X Physical Damage to Attacks against Frozen Enemies', 'Adds X to X Physical Damage to Attacks per X Dexterity', 'Adds X to X Physical Damage to Attacks with Bows', 'Adds X-X Fire Damage to Spells and Attacks', 'Aura Buffs do not affect you', 'Always Freezes enemies', 'Always Poison on Hit', 'Amulet: (X-X)% increased Armour', 'Amulet: (X-X)% increased Evasion Rating', 'Amulet: (X-X)% increased Global Critical Strike Chance', 'Amulet: (X-X)% increased maximum Energy Shield', 'Amulet: (X-X)% to Global Critical Strike Multiplier', 'Amulet: Adds (X-X) to (X-X) Physical Damage to Attacks', 'Amulet: X% chance to Recover X% of Maximum Mana when you use a Skill', 'Amulet: X% increased Life Leeched per second', 'Amulet: X% increased effect of Fortify on You', 'Amulet: X% of Chaos Damage Leeched as Life', 'Applies level X Elemental Weakness on Blocking a Spell', 'Applies level X Punishment on Blocking a Melee Attack', 'Applies level X Temporal Chains on Blocking a Projectile Attack', 'Area becomes fatal after some time', 'Area contains a Large Chest', 'Area contains many Totems', 'Area contains no monsters', 'Area contains two Unique Bosses', 'Area has X seconds between monster waves', 'Area has X waves of monsters', 'Area has increased monster variety', 'Area has patches of burning ground', 'Area has patches of chilled ground', 'Area has patches of desecrated ground', 'Area has patches of shocking ground', 'Area is a Maze', 'Area is a large Maze', 'Area is inhabited by Abominations', 'Area is inhabited by Animals', 'Area is inhabited by Demons', 'Area is inhabited by Goatmen', 'Area is inhabited by Humanoids', 'Area is inhabited by Sea Witches and their Spawn', 'Area is inhabited by Skeletons', 'Area is inhabited by Undead', 'Area is inhabited by X additional Rogue Exiles', 'Area is inhabited by ranged monsters', 'Armour is increased by Uncapped Fire Resistance', 'Armour: (X-X) to maximum Energy Shield', 'Armour: (X-X) to maximum Life', 'Armour: (X-X)% to Chaos Resistance', 'Armour: (X-X)% to Cold Resistance', 'Armour: (X-X)% to Fire Resistance', 'Armour: (X-X)% to Lightning Resistance', 'Armour: Minions have (X-X)% increased maximum Life', 'Arrows always Pierce', 'Arrows always Pierce after Chaining', 'Arrows that Pierce cause Bleeding', 'Attack Projectiles Return to You after hitting targets', 'Attack skills can have X additional Totem Summoned at a time', 'Attack with level X Bone Nova when you Kill a Bleeding Enemy', 'Attacks Cause Bleeding when Hitting Cursed Enemies', 'Attacks Chain an additional time when in Main Hand', 'Attacks have Blood Magic', 'Attacks have an additional Projectile when in Off Hand', 'Attacks used by Totem have X% less Attack Speed', 'Attacks with +X to Melee range', 'Attacks with this Weapon Maim on hit', 'Attacks with this Weapon Penetrate X% Elemental Resistances', 'Attacks with this Weapon deal double Damage to Chilled Enemies', 'Attacks with this Weapon have X% increased Elemental Damage', 'Avatar of Fire', 'Base duration is X seconds', 'Base secondary duration is X seconds', 'Beams Split to hit X extra targets', 'Belt: (X-X) to Armour', 'Belt: (X-X) to maximum Energy Shield', 'Belt: (X-X)% chance to Avoid being Frozen', 'Belt: (X-X)% chance to Avoid being Ignited', 'Belt: (X-X)% chance to Avoid being Shocked', 'Belt: (X-X)% increased Flask Life Recovery rate', 'Belt: (X-X)% increased Flask Mana Recovery rate', 'Belt: (X-X)% increased Stun Duration on Enemies', 'Belt: (X-X)% increased Stun and Block Recovery', 'Belt: (X-X)% reduced Enemy Stun Threshold', 'Belt: (X-X)% to Chaos Resistance', 'Belt: (X-X)% to Cold Resistance', 'Belt: (X-X)% to Fire Resistance', 'Belt: (X-X)% to Lightning Resistance', 'Belt: +X% to Chaos Resistance while using a Flask', 'Belt: Damage Penetrates X% Elemental Resistances while using a Flask', 'Belt: Minions have (X-X)% increased maximum Life', 'Belt: Reflects (X-X) Physical Damage to Melee Attackers', 'Belt: X% additional Physical Damage Reduction while using a Flask', 'Belt: X% increased Movement Speed while using a Flask', 'Bleeding targets take X% of the Physical Damage Dealt per second', 'Bleeding targets take an additional X% of the Physical Damage Dealt per second while moving', 'Blind Chilled Enemies on Hit', 'Blood Magic', 'Body Armour: (X-X) to Armour', 'Body Armour: (X-X) to Evasion Rating', 'Body Armour: (X-X) to maximum Energy Shield', 'Body Armour: (X-X) to maximum Life', 'Body Armour: (X-X)% chance to Avoid Cold Damage when Hit', 'Body Armour: (X-X)% chance to Avoid Fire Damage when Hit', 'Body Armour: (X-X)% chance to Avoid Lightning Damage when Hit', 'Body Armour: Gain Onslaught for X seconds when Hit', 'Body Armour: X% increased Area of Effect of Area Skills', 'Body Armour: X% of Physical Damage taken as Cold Damage', 'Body Armour: X% reduced Chaos Damage taken over time', 'Boots: (X-X) to Evasion Rating', 'Boots: (X-X) to maximum Energy Shield', 'Boots: (X-X) to maximum Life', 'Boots: Cannot be Poisoned', 'Boots: Drops Burning Ground while moving, dealing X Fire Damage per second', 'Boots: X% increased Movement Speed', 'Boots: X% increased Movement speed while on Burning, Chilled or Shocked ground', 'Boots: X% reduced Elemental Damage Taken while stationary', 'Bow Knockback at Close Range', 'Bow: +X to Level of Socketed Bow Gems', 'Buff is applied for a Base Duration of X seconds', 'Burning Debuff can have a maximum of X stages', 'Burning Hoofprints', 'Can Summon up to X Golem at a time', 'Can Summon up to X additional Golem at a time', 'Can deal X to X base Cold Damage', 'Can deal X to X base Fire Damage', 'Can deal X to X base Lightning Damage', 'Can have X additional Siege Ballista Totem per X Dexterity', 'Can have multiple Crafted Mods', 'Can have up to X active spinning blades', 'Can have up to X additional Remote Mines placed at a time', 'Can have up to X additional Totem summoned at a time', 'Can have up to X additional Trap placed at a time', 'Can have up to X additional Traps placed at a time', 'Can raise up to X Spectre at a time', 'Can raise up to X Zombies at a time', 'Can summon up to X Animated Weapons at a time', 'Can summon up to X Raging Spirits at a time', 'Can summon up to X Skeletons at a time', 'Can use Items requiring up to level X', 'Cannot Ignite', 'Cannot Knock Enemies Back', 'Cannot Leech', 'Cannot Leech Life from Critical Strikes', 'Cannot Leech Life from Monsters', 'Cannot Leech Mana', 'Cannot Leech Mana from Monsters', 'Cannot Leech when on Low Life', 'Cannot apply Shock', 'Cannot be Blinded', 'Cannot be Chilled', 'Cannot be Chilled while you have Onslaught', 'Cannot be Frozen', 'Cannot be Frozen, Chilled or Ignited with Her Blessing', 'Cannot be Ignited', 'Cannot be Ignited while on Low Life', 'Cannot be Knocked Back', 'Cannot be Poisoned', 'Cannot be Shocked', 'Cannot be Stunned', 'Cannot be Stunned when on Low Life', 'Cannot be inflicted with Bleeding', 'Cannot be used with Chaos Inoculation', 'Cannot cause Bleeding', 'Cannot gain Power Charges', 'Cannot roll Attack Mods', 'Cannot roll Caster Mods', 'Cast Socketed Minion Spells on Kill with this Weapon',
             , 'Casts level X Spectral Spirits when equipped', 'Causes Bleeding on Hit', 'Causes Bleeding on Hit for X seconds', 'Causes Bleeding on Melee Critical Strike', 'Causes X Explosions', 'Causes smaller novas up to X times on enemies hit', 'Celestial Footprints', 'Chain +X Times', 'Chaos Damage does not bypass Energy Shield', 'Chaos Damage does not bypass Energy Shield during effect', 'Chaos Damage does not bypass Energy Shield while not on Low Life or Low Mana', 'Chests have X% increased Item Rarity', 'Chill Enemy for X second when Hit', 'Chill Enemy for X seconds when Hit', 'Chill and Freeze duration on you is based on X% of Energy Shield', 'Conduit', 'Consumes Frenzy Charges on use', 'Contains the Immortalised Grandmasters'
@@ -52,8 +54,19 @@
         //     }
         // }
 
+        vm.addMod = function () {
+            if (!vm.item.Mods_content)
+                vm.item.Mods_content = [];
+            vm.item.Mods_content.push({mods_name: 'Select', mods_group: 'and', mods_weight: 1});
+        };
+
+        vm.removeMod = function (index) {
+            vm.item.Mods_content.splice(index, 1);
+        };
+
         vm.reloadRoute = function () {
             vm.item = {};
+            vm.item.Mods_content = [];
             vm.item.league = 'Legacy';
             vm.item.type = 'any';
             vm.item.mods_name = 'Select';
@@ -121,8 +134,10 @@
                 delete vm.item.type;
             if (vm.item.typeLine == "any")
                 delete vm.item.typeLine;
-            if (vm.item.Mods_content == "Select")
-                delete vm.item.Mods_content;
+            if (vm.item.Mods_content)
+                vm.item.Mods_content = vm.item.Mods_content.filter(function (mod) {
+                    return mod.mods_name != "Select";
+                });
             if (vm.item.currency_name == "Select")
                 delete vm.item.currency_name;
             if (vm.item.rarity == "any")
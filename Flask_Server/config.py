@@ -8,6 +8,20 @@ class Config:
     SQLALCHEMY_COMMIT_ON_TEARDOWN = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # one pooled MongoClient for the whole app, made by flask_pymongo in CreateApp
+    MONGO_HOST = os.environ.get('MONGO_HOST', 'mongodb://localhost:27017/')
+    MONGO_DBNAME = os.environ.get('MONGO_DBNAME', 'project_542')
+    MONGO_CONNECT_TIMEOUT_MS = 2000
+    MONGO_SOCKET_TIMEOUT_MS = 10000
+    # connect on the first query, not in the process that forks the workers
+    MONGO_CONNECT = False
+    # put into the host uri by CreateApp, flask_pymongo 0.4.1 can not pass them to pymongo 3
+    MONGO_POOL_SIZE = 50
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = 1000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = 2000
+    # build the missing search indexes in the background when the app starts, or run python manage.py indexes
+    MONGO_ENSURE_INDEXES = False
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
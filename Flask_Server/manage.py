@@ -0,0 +1,23 @@
+from flask_script import Manager
+from api_server import CreateApp, mongo
+from api_server import mongo_indexes
+
+manager = Manager(CreateApp)
+manager.add_option('-c', '--config', dest='config_name', default='dev')
+
+
+@manager.command
+def indexes(wait=False):
+    """Build the missing search indexes in the background, then report them"""
+    mongo_indexes.ensure_indexes(mongo.db.posts)
+    mongo_indexes.report(mongo.db, wait=wait)
+
+
+@manager.command
+def index_report(wait=False):
+    """Show the search indexes, their sizes and the builds in progress"""
+    mongo_indexes.report(mongo.db, wait=wait)
+
+
+if __name__ == "__main__":
+    manager.run()